@@ -22,6 +22,8 @@ from graphalama.widgets import Button, ImageButton, CheckBox
 from graphalama.core import WidgetList, Widget
 from graphalama.shapes import Padding, Rectangle, RoundedRect
 
+from utils import render_text
+
 SELECT_RANGE = 50
 COLORS = [
     (253, 151, 31),
@@ -270,15 +272,15 @@ class Graph:
         # Draw text info
         p = len(self)
         q = len(self.edges)
-        p_text = self.font.render(f"p = {p}", True, WHITESMOKE)
+        p_text = render_text(self.font, f"p = {p}", True, WHITESMOKE)
         p_rect = p_text.get_rect(topright=(SIZE[0] - 10, 10))
         display.blit(p_text, p_rect)
 
-        r_text = self.font.render(f"q = {q}", True, WHITESMOKE)
+        r_text = render_text(self.font, f"q = {q}", True, WHITESMOKE)
         r_rect = r_text.get_rect(topright=(SIZE[0] - 10, p_rect.bottom + 10))
         display.blit(r_text, r_rect)
 
-        f_text = self.font.render(f"f = 2 - p + q= {2 - p + q}", True, WHITESMOKE)
+        f_text = render_text(self.font, f"f = 2 - p + q= {2 - p + q}", True, WHITESMOKE)
         f_rect = f_text.get_rect(topright=(SIZE[0] - 10, r_rect.bottom + 10))
         display.blit(f_text, f_rect)
 
@@ -11,6 +11,8 @@ from pygame import Vector2 as Vec2
 import pygame.gfxdraw as gfx
 from pygame.locals import *
 
+from utils import DirtyRenderer
+
 
 SIZE = (1920, 1080)
 FPS = 60
@@ -105,6 +107,50 @@ class Camera:
         return self.ccenter + complex(self.cwidth, self.cheight) / 2
 
 
+def background(camera, mandelbrot_surf=None):
+    """The static part of the view: the mandelbrot set if given, and the axes."""
+
+    surf = pygame.Surface(camera.ssize)
+    surf.fill(BG_COLOR)
+    if mandelbrot_surf is not None:
+        surf.blit(mandelbrot_surf, (0, 0))
+
+    # Axis
+    zero = camera.to_screen(0)
+    pygame.draw.line(surf, AXIS, (0, zero[1]), (SIZE[0], zero[1]))  # X axis
+    pygame.draw.line(surf, AXIS, (zero[0], 0), (zero[0], SIZE[1]))  # Y axis
+
+    tl = camera.topleft
+    br = camera.bottomright
+
+    real = tl.real // 0.25 * 0.25
+    while real < br.real:
+        pos = camera.to_screen(real + 0j)
+        if real == int(real):
+            mult = 3
+        elif 2*real == int(2*real):
+            mult = 2
+        else:
+            mult = 1
+        pygame.draw.line(surf, AXIS, (pos[0], pos[1] - GRAD_SIZE*mult), (pos[0], pos[1] + GRAD_SIZE*mult))
+        real += 0.25
+
+    imag = tl.imag // 0.25 * 0.25
+    while imag < br.imag:
+        pos = camera.to_screen(imag * 1j)
+        if imag == int(imag):
+            mult = 3
+        elif 2*imag == int(2*imag):
+            mult = 2
+        else:
+            mult = 1
+        g = GRAD_SIZE * mult
+        pygame.draw.line(surf, AXIS, (pos[0] - g, pos[1]), (pos[0] + g, pos[1]))
+        imag += 0.25
+
+    return surf
+
+
 def main():
     screen = pygame.display.set_mode(SIZE)
     pygame.display.set_caption(CAPTION)
@@ -113,6 +159,7 @@ def main():
     camera = Camera(SIZE, complex(-0.75, 0), 2.5)
     mandelbrot_surf = mandel(camera)
     show_mand = False
+    renderer = DirtyRenderer(screen, background(camera))
 
     done = False
     while not done:
@@ -126,6 +173,7 @@ def main():
                     done = True
                 elif event.key == K_m:
                     show_mand = not show_mand
+                    renderer.invalidate(background(camera, mandelbrot_surf if show_mand else None))
                 else:
                     print(event.key)
             elif event.type == MOUSEBUTTONDOWN:
@@ -134,57 +182,15 @@ def main():
                 print(mouse, "button:", event.button)
 
         # Draw
-
-        screen.fill(BG_COLOR)
-        if show_mand:
-            screen.blit(mandelbrot_surf, (0, 0))
-        else:
-            screen.fill(BG_COLOR)
-
-        # Axis
-        zero = camera.to_screen(0)
-        pygame.draw.line(screen, AXIS, (0, zero[1]), (SIZE[0], zero[1]))  # X axis
-        pygame.draw.line(screen, AXIS, (zero[0], 0), (zero[0], SIZE[1]))  # Y axis
-
-        tl = camera.topleft
-        br = camera.bottomright
-
-        real = tl.real // 0.25 * 0.25
-        while real < br.real:
-            pos = camera.to_screen(real + 0j)
-            if real == int(real):
-                mult = 3
-            elif 2*real == int(2*real):
-                mult = 2
-            else:
-                mult = 1
-            pygame.draw.line(screen, AXIS, (pos[0], pos[1] - GRAD_SIZE*mult), (pos[0], pos[1] + GRAD_SIZE*mult))
-            real += 0.25
-
-        imag = tl.imag // 0.25 * 0.25
-        while imag < br.imag:
-            pos = camera.to_screen(imag * 1j)
-            if imag == int(imag):
-                mult = 3
-            elif 2*imag == int(2*imag):
-                mult = 2
-            else:
-                mult = 1
-            g = GRAD_SIZE * mult
-            pygame.draw.line(screen, AXIS, (pos[0] - g, pos[1]), (pos[0] + g, pos[1]))
-            imag += 0.25
+        renderer.clear()
 
         mouse = camera.to_complex(pygame.mouse.get_pos())
 
         points = [camera.to_screen(x) for x in seq(mouse, 20, 1000)]
         # print(points)
-        pygame.draw.lines(screen, LINE, False, points, )
-
-
-
-
+        renderer.mark(pygame.draw.lines(screen, LINE, False, points, ))
 
-        pygame.display.update()
+        renderer.update()
         clock.tick(FPS)
 
 if __name__ == "__main__":
@@ -1,13 +1,22 @@
-from math import cos, pi, sin
+import heapq
+import multiprocessing
+import os
+from collections import Counter, OrderedDict, defaultdict
+from functools import lru_cache
+from math import atan2, cos, gcd, hypot, pi, sin
+from operator import attrgetter
+from pprint import pprint
 from random import choice, gauss, randint, random, uniform
-from time import time
-from typing import Callable, Generic, Tuple, TypeVar, Union
+from time import perf_counter, perf_counter_ns, time
+from types import SimpleNamespace
+from typing import Callable, Dict, Generic, List, Optional, Tuple, Type, TypeVar, Union
 
+import numpy as np
 import pygame
 import pygame.gfxdraw as gfx
 from pygame import Vector2
 
-pygame.init()
+from utils import GlyphAtlas
 
 DEGREES = float
 VEC2D = Union[Tuple[float, float], Vector2]
@@ -15,8 +24,36 @@ P = TypeVar('P', bound='Particle')
 
 radians = pi / 180
 
-DEFAULT_FONT = pygame.font.Font(None, 42)
-SNOW = pygame.image.fromstring(b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00\x00\x00\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00\x00\x001\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf2\x00\x00\x001\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x841\xa2\xf2\x00W\x841\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00W\x841\xa2\xf2\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x84\x00\x00\x00\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x841\xa2\xf2\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf2\x00\x00\x001\xa2\xf2\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x841\xa2\xf2\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf21\xa2\xf2\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x84\x00W\x84\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x001\xa2\xf21\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00\x00\x00\x00W\x84\x00\x00\x001\xa2\xf2\x00\x00\x00\x00W\x84\x00\x00\x00\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00\x00\x001\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00\x00\x00\x00W\x84\x00\x00\x001\xa2\xf2\x00\x00\x00\x00W\x84\x00\x00\x00\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf21\xa2\xf2\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x84\x00W\x84\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x001\xa2\xf21\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf2\x00\x00\x001\xa2\xf2\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x841\xa2\xf2\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x84\x00\x00\x00\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x841\xa2\xf2\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x841\xa2\xf2\x00W\x841\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00W\x841\xa2\xf2\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00\x00\x00\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00', (24, 24), 'RGB')
+POOLS: Dict[type, List['Particle']] = defaultdict(list)
+"""Dead particles waiting to be reused, by class."""
+MAX_POOL_SIZE = 50_000
+
+SNOW_PIXELS = b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00\x00\x00\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00\x00\x001\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf2\x00\x00\x001\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x841\xa2\xf2\x00W\x841\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00W\x841\xa2\xf2\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x84\x00\x00\x00\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x841\xa2\xf2\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf2\x00\x00\x001\xa2\xf2\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x841\xa2\xf2\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf21\xa2\xf2\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x84\x00W\x84\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x001\xa2\xf21\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00\x00\x00\x00W\x84\x00\x00\x001\xa2\xf2\x00\x00\x00\x00W\x84\x00\x00\x00\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00\x00\x001\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00\x00\x00\x00W\x84\x00\x00\x001\xa2\xf2\x00\x00\x00\x00W\x84\x00\x00\x00\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf21\xa2\xf2\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x84\x00W\x84\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x001\xa2\xf21\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf2\x00\x00\x001\xa2\xf2\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x841\xa2\xf2\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x84\x00\x00\x00\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x841\xa2\xf2\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x841\xa2\xf2\x00W\x841\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00W\x841\xa2\xf2\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00\x00\x001\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00\x00\x00\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf21\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x841\xa2\xf2\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00W\x84\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+"""The 24x24 RGB pixels of a snowflake, black is transparent."""
+
+
+@lru_cache(maxsize=None)
+def default_font() -> pygame.font.Font:
+    """The font of the demo, loaded on first use."""
+    pygame.font.init()
+    return pygame.font.Font(None, 42)
+
+
+@lru_cache(maxsize=None)
+def snow() -> pygame.Surface:
+    """The snowflake image, decoded on first use."""
+    surf = pygame.image.fromstring(SNOW_PIXELS, (24, 24), 'RGB')
+    surf.set_colorkey((0, 0, 0))
+    return surf
+
+
+def __getattr__(name):
+    # DEFAULT_FONT and SNOW used to be loaded at import
+    if name == 'DEFAULT_FONT':
+        return default_font()
+    if name == 'SNOW':
+        return snow()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def clamp(x, mini, maxi):
@@ -47,46 +84,1668 @@ def rand2d(vec):
     return (uniform(0, vec[0]), uniform(0, vec[1]))
 
 
+class Animation:
+    """
+    A declarative animation, shared by all the particles that use it.
+
+    Calling it on a particle animates that particle only, so it can be used
+    anywhere an animation function is expected. Systems that store their
+    particles in columns call :meth:`apply_columns` instead, which animates
+    many rows at once.
+    """
+
+    def __call__(self, particle: 'Particle'):
+        raise NotImplementedError()
+
+    def apply_columns(self, columns, rows):
+        """Animate the given rows of the columns of an ArrayParticleSystem."""
+        raise NotImplementedError()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+
+class Fade(Animation):
+    """alpha = 255 * (1 - life)"""
+
+    def __call__(self, particle):
+        particle.alpha = int(255 * (1 - particle.life_prop))
+
+    def apply_columns(self, columns, rows):
+        columns.alpha[rows] = np.trunc(255 * (1 - columns.life_prop[rows]))
+
+
+class Blink(Animation):
+    """alpha = 255 * (1 - |1 - 2 life|)²"""
+
+    def __call__(self, particle):
+        a = 1 - abs(1 - 2 * particle.life_prop)
+        particle.alpha = int(255 * a ** 2)
+
+    def apply_columns(self, columns, rows):
+        a = 1 - np.abs(1 - 2 * columns.life_prop[rows])
+        columns.alpha[rows] = np.trunc(255 * a ** 2)
+
+
+class Shrink(Animation):
+    """size = initial_size * (1 - life)"""
+
+    def __call__(self, particle):
+        particle.size = particle.initial_size * (1 - particle.life_prop)
+
+    def apply_columns(self, columns, rows):
+        columns.size[rows] = columns.initial_size[rows] * (1 - columns.life_prop[rows])
+
+
+class BounceRect(Animation):
+    """Bounce inside of a rectangle."""
+
+    def __init__(self, rect: Tuple[int, int, int, int]):
+        self.rect = pygame.Rect(rect)
+
+    def __repr__(self):
+        return f'BounceRect({tuple(self.rect)})'
+
+    def __call__(self, particle):
+        rect = self.rect
+        angle = particle.angle % 360
+        if particle.pos.x - particle.size < rect.left and 90 < angle < 270:
+            particle.angle = 180 - angle
+        elif particle.pos.x + particle.size > rect.right and (angle < 90 or angle > 270):
+            particle.angle = 180 - angle
+
+        angle = particle.angle % 360
+        if particle.pos.y - particle.size < rect.top and angle > 180:
+            particle.angle = -angle
+        elif particle.pos.y + particle.size > rect.bottom and angle < 180:
+            particle.angle = -angle
+
+    def apply_columns(self, columns, rows):
+        rect = self.rect
+        x, y = columns.pos[rows].T
+        size = columns.size[rows]
+        angle = columns.angle[rows]
+
+        a = angle % 360
+        left = (x - size < rect.left) & (90 < a) & (a < 270)
+        right = ~left & (x + size > rect.right) & ((a < 90) | (a > 270))
+        angle = np.where(left | right, 180 - a, angle)
+
+        a = angle % 360
+        top = (y - size < rect.top) & (a > 180)
+        bottom = ~top & (y + size > rect.bottom) & (a < 180)
+        columns.angle[rows] = np.where(top | bottom, -a, angle)
+
+
+FADE = Fade()
+BLINK = Blink()
+SHRINK = Shrink()
+
+
+@lru_cache(maxsize=None)
+def bounce_rect(rect: Tuple[int, int, int, int]) -> BounceRect:
+    """The BounceRect animation for this rect, shared by all particles."""
+    return BounceRect(rect)
+
+
+class SpatialHash:
+    """
+    Particles bucketed by the cell of a grid that contains their position,
+    to find those near a point or in a rect without looking at all of them.
+    """
+
+    def __init__(self, cell_size: float, particles=()):
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], List['Particle']] = defaultdict(list)
+        for particle in particles:
+            x, y = particle.pos
+            self.cells[int(x // cell_size), int(y // cell_size)].append(particle)
+
+    def in_rect(self, rect) -> List['Particle']:
+        """All the particles in the cells that intersect the rect."""
+
+        size = self.cell_size
+        rect = pygame.Rect(rect)
+        cells = self.cells
+
+        particles = []
+        for x in range(int(rect.left // size), int((rect.right - 1) // size) + 1):
+            for y in range(int(rect.top // size), int((rect.bottom - 1) // size) + 1):
+                cell = cells.get((x, y))
+                if cell:
+                    particles.extend(cell)
+        return particles
+
+    def near(self, pos: VEC2D, radius: float) -> List['Particle']:
+        """All the particles at most radius away from pos."""
+
+        size = self.cell_size
+        x, y = pos
+        r2 = radius * radius
+        cells = self.cells
+
+        particles = []
+        for cx in range(int((x - radius) // size), int((x + radius) // size) + 1):
+            for cy in range(int((y - radius) // size), int((y + radius) // size) + 1):
+                for particle in cells.get((cx, cy), ()):
+                    px, py = particle.pos
+                    if (px - x) ** 2 + (py - y) ** 2 <= r2:
+                        particles.append(particle)
+        return particles
+
+
+def velocity(particle: 'Particle') -> Tuple[float, float]:
+    rad = particle.angle * radians
+    return cos(rad) * particle.speed, sin(rad) * particle.speed
+
+
+def accelerate(particle: 'Particle', ax: float, ay: float):
+    """Add (ax, ay) to the velocity of the particle, keeping it as a speed and an angle."""
+
+    vx, vy = velocity(particle)
+    vx += ax
+    vy += ay
+    particle.speed = hypot(vx, vy)
+    if particle.speed:
+        particle.angle = atan2(vy, vx) / radians
+
+
+class Force:
+    """
+    A change of velocity of particles, that may depend on their neighbours.
+
+    A force is shared by particles like an :class:`Animation`, and only the
+    particles sharing the same force instance see each other as neighbours.
+    Forces are applied by :class:`ParticleSystem`, before the particles move.
+    """
+
+    radius = 0.0
+    """How far the neighbours of a particle are. Zero if the force does not use them."""
+
+    def push(self, particle: 'Particle', neighbours: Optional[SpatialHash]) -> Tuple[float, float]:
+        """The acceleration of the particle, in px/frame²."""
+        raise NotImplementedError()
+
+    def apply(self, particles: List['Particle']):
+        neighbours = SpatialHash(self.radius, particles) if self.radius else None
+        # All the pushes are computed before any velocity changes, so the order does not matter.
+        pushes = [self.push(particle, neighbours) for particle in particles]
+        for particle, (ax, ay) in zip(particles, pushes):
+            if ax or ay:
+                accelerate(particle, ax, ay)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+
+class Attractor(Force):
+    """Pull of constant strength towards a point, or a function returning a point."""
+
+    def __init__(self, point: Union[VEC2D, Callable[[], VEC2D]], strength: float):
+        self.point = point
+        self.strength = strength
+
+    def __repr__(self):
+        return f'Attractor({self.point!r}, {self.strength})'
+
+    def apply(self, particles):
+        # Only read a moving point once per frame
+        self._target = self.point() if callable(self.point) else self.point
+        super().apply(particles)
+
+    def push(self, particle, neighbours):
+        tx, ty = self._target
+        dx = tx - particle.pos.x
+        dy = ty - particle.pos.y
+        dist = hypot(dx, dy)
+        if dist < 1:
+            return 0, 0
+        return dx * self.strength / dist, dy * self.strength / dist
+
+
+class Repulsion(Force):
+    """Push away from the neighbours, stronger when they are closer."""
+
+    def __init__(self, radius: float, strength: float):
+        self.radius = radius
+        self.strength = strength
+
+    def __repr__(self):
+        return f'Repulsion({self.radius}, {self.strength})'
+
+    def push(self, particle, neighbours):
+        x, y = particle.pos
+        ax = ay = 0
+        for other in neighbours.near(particle.pos, self.radius):
+            dx = x - other.pos.x
+            dy = y - other.pos.y
+            dist = hypot(dx, dy)
+            if dist:
+                strength = self.strength * (1 - dist / self.radius) / dist
+                ax += dx * strength
+                ay += dy * strength
+        return ax, ay
+
+
+class Flocking(Force):
+    """
+    Boids: keep away from the closest neighbours (separation),
+    go in the same direction as the neighbours (alignment)
+    and towards their center (cohesion).
+    """
+
+    def __init__(self, radius: float, separation=0.05, alignment=0.05, cohesion=0.005):
+        self.radius = radius
+        self.separation = separation
+        self.alignment = alignment
+        self.cohesion = cohesion
+
+    def __repr__(self):
+        return (f'Flocking({self.radius}, {self.separation}, '
+                f'{self.alignment}, {self.cohesion})')
+
+    def apply(self, particles):
+        self._velocities = {particle: velocity(particle) for particle in particles}
+        super().apply(particles)
+        self._velocities = None
+
+    def push(self, particle, neighbours):
+        velocities = self._velocities
+        x, y = particle.pos
+        sep_x = sep_y = 0
+        sum_vx = sum_vy = 0
+        sum_x = sum_y = 0
+        count = 0
+        for other in neighbours.near(particle.pos, self.radius):
+            if other is particle:
+                continue
+            ox, oy = other.pos
+            dist = hypot(x - ox, y - oy)
+            if dist:
+                away = (1 - dist / self.radius) / dist
+                sep_x += (x - ox) * away
+                sep_y += (y - oy) * away
+            vx, vy = velocities[other]
+            sum_vx += vx
+            sum_vy += vy
+            sum_x += ox
+            sum_y += oy
+            count += 1
+
+        if not count:
+            return 0, 0
+
+        vx, vy = velocities[particle]
+        return (
+            self.separation * sep_x
+            + self.alignment * (sum_vx / count - vx)
+            + self.cohesion * (sum_x / count - x),
+            self.separation * sep_y
+            + self.alignment * (sum_vy / count - vy)
+            + self.cohesion * (sum_y / count - y),
+        )
+
+
+@lru_cache(maxsize=None)
+def attractor(point, strength: float) -> Attractor:
+    """The Attractor with these parameters, shared by all particles."""
+    return Attractor(point, strength)
+
+
+@lru_cache(maxsize=None)
+def repulsion(radius: float, strength: float) -> Repulsion:
+    """The Repulsion with these parameters, shared by all particles."""
+    return Repulsion(radius, strength)
+
+
+@lru_cache(maxsize=None)
+def flocking(radius: float, separation=0.05, alignment=0.05, cohesion=0.005) -> Flocking:
+    """The Flocking with these parameters, shared by all particles."""
+    return Flocking(radius, separation, alignment, cohesion)
+
+
+@lru_cache(maxsize=None)
+def unit_polygon(vertices: int, vertex_step=1) -> Tuple[Tuple[float, float], ...]:
+    """Vertices of the regular polygon of radius 1, not rotated, in drawing order."""
+    return tuple(
+        (cos(2 * pi * i * vertex_step / vertices), sin(2 * pi * i * vertex_step / vertices))
+        for i in range(vertices)
+    )
+
+
+@lru_cache(maxsize=None)
+def unit_shard(head: float, tail: float) -> Tuple[Tuple[float, float], ...]:
+    """Vertices of the shard of side 1 pointing to the right."""
+    return (head, 0), (0, 1), (-tail, 0), (0, -1)
+
+
+def outline_points(unit, x: float, y: float, size: float, rotation: DEGREES):
+    """The vertices of a unit shape, scaled, rotated and moved to (x, y)."""
+
+    rad = rotation * radians
+    c = size * cos(rad)
+    s = size * sin(rad)
+    return [(x + c * ux - s * uy, y + s * ux + c * uy) for ux, uy in unit]
+
+
+def outline_arrays(unit, x: np.ndarray, y: np.ndarray, size: np.ndarray, rotation: np.ndarray):
+    """:func:`outline_points` for n shapes at once, as a (n, vertices, 2) array."""
+
+    unit = np.asarray(unit, dtype=float)
+    rad = np.radians(rotation)
+    c = (size * np.cos(rad))[:, None]
+    s = (size * np.sin(rad))[:, None]
+    ux, uy = unit[:, 0], unit[:, 1]
+
+    points = np.empty((len(x), len(unit), 2))
+    points[..., 0] = x[:, None] + c * ux - s * uy
+    points[..., 1] = y[:, None] + s * ux + c * uy
+    return points
+
+
+class PolygonBatch:
+    """
+    Polygon shaped particles, whose vertices are all computed in one array
+    operation per shape when the batch is filled.
+
+    The state of the particles is copied when they are added, so they
+    can move (or be interpolated back) before the batch is filled.
+    """
+
+    MIN_ARRAY_SIZE = 32
+    """Below this number of particles, NumPy costs more than it saves."""
+
+    def __init__(self):
+        self._shapes = {}
+        """id of the unit shape -> (unit shape, rows, colors)"""
+
+    def add(self, particle) -> bool:
+        """Add the particle if it has an outline, and say whether it did."""
+
+        outline = particle.outline()
+        if outline is None:
+            return False
+
+        unit, rotation = outline
+        try:
+            _, rows, colors = self._shapes[id(unit)]
+        except KeyError:
+            _, rows, colors = self._shapes[id(unit)] = unit, [], []
+        rows.append((particle.pos.x, particle.pos.y, particle.size, rotation))
+        colors.append(tuple(particle.color))
+        return True
+
+    def __len__(self):
+        return sum(len(rows) for _, rows, _ in self._shapes.values())
+
+    def fill(self, surf: pygame.Surface):
+        """Draw the polygons added since the last call."""
+
+        for unit, rows, colors in self._shapes.values():
+            if len(rows) < self.MIN_ARRAY_SIZE:
+                polygons = [outline_points(unit, *row) for row in rows]
+            else:
+                x, y, size, rotation = np.array(rows).T
+                polygons = outline_arrays(unit, x, y, size, rotation).tolist()
+            for polygon, color in zip(polygons, colors):
+                gfx.filled_polygon(surf, polygon, color)
+        self._shapes.clear()
+
+
+class StampCache:
+    """
+    A bounded LRU cache of pre-rasterized particle surfaces.
+
+    Keys are built by the particles from their shape, quantized size,
+    quantized rotation and color. See DrawnParticle.stamp.
+
+    It is only faster when most particles share those, as rasterizing a
+    stamp costs more than drawing the particle once. So particle systems
+    use it only when given one, like STAMPS.
+    """
+
+    ALPHA_STEP = 8
+    ROTATION_STEPS = 32
+
+    def __init__(self, max_stamps=4096):
+        self.max_stamps = max_stamps
+        self.hits = 0
+        self.misses = 0
+        self._stamps = OrderedDict()
+
+    def __len__(self):
+        return len(self._stamps)
+
+    def get(self, key, rasterize, *args) -> pygame.Surface:
+        """Return the stamp for key, calling rasterize(*args) if it is missing."""
+
+        try:
+            stamp = self._stamps[key]
+        except KeyError:
+            self.misses += 1
+            stamp = self._stamps[key] = rasterize(*args)
+            if len(self._stamps) > self.max_stamps:
+                self._stamps.popitem(last=False)
+        else:
+            self.hits += 1
+            self._stamps.move_to_end(key)
+        return stamp
+
+    def clear(self):
+        self._stamps.clear()
+        self.hits = self.misses = 0
+
+    @classmethod
+    def quantize_alpha(cls, alpha: int):
+        return min(255, cls.ALPHA_STEP * round(alpha / cls.ALPHA_STEP))
+
+    @classmethod
+    def quantize_rotation(cls, rotation: DEGREES, period: DEGREES = 360):
+        """Index of the rotation, in ROTATION_STEPS per period."""
+        return round(rotation % period / period * cls.ROTATION_STEPS) % cls.ROTATION_STEPS
+
+
+STAMPS = StampCache()
+"""A cache that particle systems can share, when stamps are worth it."""
+
+
+class ScaledSurfaceCache:
+    """
+    Scaled copies of surfaces, shared by every particle that uses them.
+
+    Entries are keyed by the identity of the source surface and the target
+    size. When the scaled surfaces take more than max_bytes, the least
+    recently used ones are dropped.
+    """
+
+    def __init__(self, max_bytes=32 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # The source is kept in the value so that its id cannot be reused.
+        self._surfaces = OrderedDict()
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def get(self, source: pygame.Surface, size: Tuple[int, int]) -> pygame.Surface:
+        """The source scaled to size. Do not modify it, it is shared."""
+
+        key = (id(source), size)
+        try:
+            scaled = self._surfaces[key][1]
+        except KeyError:
+            self.misses += 1
+            scaled = pygame.transform.scale(source, size)
+            self._surfaces[key] = (source, scaled)
+            self.bytes += self.nbytes(scaled)
+            self._evict()
+        else:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+        return scaled
+
+    def _evict(self):
+        # The most recent surface is always kept, even if it is too big.
+        while self.bytes > self.max_bytes and len(self._surfaces) > 1:
+            _, (_, scaled) = self._surfaces.popitem(last=False)
+            self.bytes -= self.nbytes(scaled)
+
+    def clear(self):
+        self._surfaces.clear()
+        self.bytes = self.hits = self.misses = 0
+
+    @staticmethod
+    def nbytes(surf: pygame.Surface):
+        return surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+
+SCALED_SURFACES = ScaledSurfaceCache()
+
+
+def interpolated(particles, interpolation: float):
+    """
+    Yield each particle moved between its previous and current position.
+
+    The particle is put back to its position when the next one is requested,
+    so it has to be drawn before that.
+    """
+
+    for particle in particles:
+        pos = particle.pos
+        x, y = pos
+        px, py = particle.prev_pos
+        pos.update(px + (x - px) * interpolation, py + (y - py) * interpolation)
+        yield particle
+        pos.update(x, y)
+
+
+class AccumulationBuffer:
+    """
+    Composites translucent particles with NumPy, instead of one blended draw each.
+
+    The coverage of each translucent particle is added to float buffers,
+    which are blended with the surface once at the end of the frame. With
+    mode='add', colors are added like light. With mode='over', overlapping
+    particles are averaged, weighted by their alpha, and cover the background
+    as much as if they were drawn one over the other. This is weighted blended
+    order-independent transparency, so the draw order does not matter.
+
+    Only particles whose :meth:`Particle.coverage` is not None are splatted,
+    the others are drawn as usual, before the composited ones.
+    """
+
+    MODES = ('add', 'over')
+
+    def __init__(self, mode='over'):
+        if mode not in self.MODES:
+            raise ValueError(f'Unknown mode {mode!r}, expected one of {self.MODES}.')
+        self.mode = mode
+        self._masks = {}
+        self._splats = defaultdict(list)
+
+    def mask(self, key) -> Tuple[np.ndarray, np.ndarray]:
+        """The x and y offsets of the pixels covered by the shape."""
+
+        try:
+            return self._masks[key]
+        except KeyError:
+            rasterize, args = key
+            alpha = pygame.surfarray.array_alpha(rasterize(*args))
+            mask = self._masks[key] = np.nonzero(alpha)
+            return mask
+
+    def filter(self, particles):
+        """Keep the translucent particles that can be splatted, and yield the others."""
+
+        splats = self._splats
+        for particle in particles:
+            coverage = particle.coverage() if particle.alpha < 255 else None
+            if coverage is None:
+                yield particle
+            else:
+                key, (x, y) = coverage
+                splats[key].append((x, y, *particle.color))
+
+    def composite(self, surf: pygame.Surface):
+        """Blend the particles splatted since the last call on the surface."""
+
+        if not self._splats:
+            return
+
+        clip = surf.get_clip()
+        height = surf.get_height()
+        indices = []
+        owners = []
+        colors = []
+        for key, splats in self._splats.items():
+            dx, dy = self.mask(key)
+            splats = np.array(splats, dtype=float)
+            x = splats[:, :1].astype(int) + dx
+            y = splats[:, 1:2].astype(int) + dy
+            inside = (x >= clip.left) & (x < clip.right) & (y >= clip.top) & (y < clip.bottom)
+            indices.append((x * height + y)[inside])
+            # Which particle covers each pixel
+            owner = np.arange(len(splats)) + sum(map(len, colors))
+            owners.append(np.broadcast_to(owner[:, None], x.shape)[inside])
+            colors.append(splats[:, 2:])
+        self._splats.clear()
+
+        # Sums are only over the covered pixels, so the cost does not depend on the screen size.
+        covered, pixel = np.unique(np.concatenate(indices), return_inverse=True)
+        owner = np.concatenate(owners)
+        colors = np.concatenate(colors)
+        alpha = colors[:, 3] / 255
+
+        def total(weights):
+            return np.bincount(pixel, weights[owner], minlength=len(covered))
+
+        rgb = np.stack([total(colors[:, c] * alpha) for c in range(3)], axis=1)
+        x, y = np.divmod(covered, height)
+
+        pixels = pygame.surfarray.pixels3d(surf)
+        dest = pixels[x, y].astype(float)
+        if self.mode == 'add':
+            dest += rgb
+        else:
+            reveal = np.exp(total(np.log1p(-alpha)))[:, None]
+            mean = rgb / np.maximum(total(alpha), 1e-9)[:, None]
+            dest = dest * reveal + mean * (1 - reveal)
+        pixels[x, y] = np.clip(dest, 0, 255)
+        del pixels
+
+
+def draw_particles(particles, surf: pygame.Surface, stamps: Optional[StampCache],
+                   interpolation=1.0, accumulation: Optional[AccumulationBuffer] = None):
+    """
+    Draw the particles on the surface.
+
+    Particles that can be stamped are sent in one Surface.blits call,
+    the polygons that cannot go in a :class:`PolygonBatch` and the others
+    are drawn one by one.
+
+    Args:
+        interpolation: where to draw the particles between their position at the
+            previous logic step (0) and their current position (1).
+        accumulation: if set, translucent particles are composited through it.
+    """
+
+    if interpolation != 1:
+        particles = interpolated(particles, interpolation)
+    if accumulation is not None:
+        particles = accumulation.filter(particles)
+
+    polygons = PolygonBatch()
+    if stamps is None:
+        for particle in particles:
+            if not polygons.add(particle):
+                particle.draw(surf)
+        polygons.fill(surf)
+    else:
+        blits = []
+        for particle in particles:
+            stamp = particle.stamp(stamps)
+            if stamp is not None:
+                blits.append(stamp)
+            elif not polygons.add(particle):
+                particle.draw(surf)
+
+        polygons.fill(surf)
+        surf.blits(blits, doreturn=False)
+
+    if accumulation is not None:
+        accumulation.composite(surf)
+
+
+def animation_name(animation) -> str:
+    if isinstance(animation, Animation):
+        return animation.__class__.__name__
+    return getattr(animation, '__qualname__', repr(animation))
+
+
+class SystemStats:
+    """
+    What a ParticleSystem spends its time on.
+
+    Counters are indexed by particle class name, except
+    animation_ns which is indexed by animation name.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.alive = Counter()
+        """Live particles after the last logic step."""
+        self.spawned = Counter()
+        """Particles added since the last logic step."""
+        self.died = Counter()
+        """Particles that died in the last logic step."""
+        self.total_spawned = Counter()
+        self.total_died = Counter()
+        self.logic_ns = Counter()
+        """Cumulative time in Particle.logic, animations included."""
+        self.draw_ns = Counter()
+        """Cumulative time to draw, blits shared by number of stamps."""
+        self.animation_ns = Counter()
+
+    def end_frame(self, dead):
+        self.frames += 1
+        self.died = Counter(p.__class__.__name__ for p in dead)
+        self.total_died += self.died
+        self.total_spawned += self.spawned
+        self.spawned = Counter()
+
+    def report(self) -> dict:
+        """Per frame averages, in milliseconds, that can be dumped in JSON."""
+
+        frames = max(1, self.frames)
+
+        def ms(counter):
+            return {name: round(ns / frames / 1e6, 4) for name, ns in counter.most_common()}
+
+        return {
+            'frames': self.frames,
+            'alive': dict(self.alive),
+            'spawned_per_frame': {name: n / frames for name, n in self.total_spawned.items()},
+            'died_per_frame': {name: n / frames for name, n in self.total_died.items()},
+            'logic_ms': ms(self.logic_ns),
+            'draw_ms': ms(self.draw_ns),
+            'animation_ms': ms(self.animation_ns),
+        }
+
+
+class ParticleBudget:
+    """
+    Keeps the time spent on particles under a target, by lowering the quality.
+
+    The quality goes from 1 (everything) down to min_quality. When the
+    frames take longer than target_ms, it is cut quickly, and it comes back
+    slowly when there is headroom. A lower quality:
+     - scales the frequency of the fountains of the system,
+     - draws the small particles as plain rects, up to max_lod_size pixels,
+     - caps the population at quality * max_particles, killing the oldest first.
+
+    Effects can read :attr:`quality` to adapt themselves too.
+    """
+
+    def __init__(self, target_ms=8.0, max_particles: Optional[int] = None,
+                 min_quality=0.1, max_lod_size=3.0):
+        self.target_ms = target_ms
+        self.max_particles = max_particles
+        self.min_quality = min_quality
+        self.max_lod_size = max_lod_size
+
+        self.quality = 1.0
+        self.frame_ms = 0.0
+        """Smoothed time spent on logic and draw per frame."""
+        self._spent_ns = 0
+
+    @property
+    def lod_size(self) -> float:
+        """Particles smaller than this are drawn as plain rects."""
+        return self.max_lod_size * (1 - self.quality)
+
+    @property
+    def population_cap(self) -> Optional[int]:
+        if self.max_particles is None:
+            return None
+        return int(self.max_particles * self.quality)
+
+    def spent(self, ns: int):
+        self._spent_ns += ns
+
+    def end_frame(self):
+        """Adapt the quality to the time spent since the last frame."""
+
+        self.frame_ms += 0.2 * (self._spent_ns / 1e6 - self.frame_ms)
+        self._spent_ns = 0
+
+        if self.frame_ms > self.target_ms:
+            self.quality = max(self.min_quality, self.quality * 0.9)
+        elif self.frame_ms < 0.8 * self.target_ms:
+            self.quality = min(1.0, self.quality + 0.01)
+
+    def draw_small(self, particles, surf: pygame.Surface):
+        """Draw the small particles as rects and yield the others."""
+
+        lod_size = self.lod_size
+        fill = surf.fill
+        for particle in particles:
+            size = particle.size
+            if size < lod_size and isinstance(particle, DrawnParticle):
+                fill(particle.color, (particle.pos.x - size, particle.pos.y - size, 2 * size, 2 * size))
+            else:
+                yield particle
+
+
 class ParticleSystem(set):
+    def __init__(self, particles=(), stamps: Optional[StampCache] = None, recycle=True,
+                 cell_size: Optional[int] = None, world_bounds=None,
+                 accumulation: Optional[AccumulationBuffer] = None,
+                 budget: Optional[ParticleBudget] = None):
+        """
+        A set of particles.
+
+        Args:
+            particles: initial particles
+            stamps: if set, cache used to draw the particles through pre-rasterized
+                surfaces. Otherwise each particle rasterizes itself every frame.
+            recycle: put dead particles back in the pool of their class,
+                so that they are reused by the next particles created.
+                Do not keep references to particles if this is set.
+            cell_size: if set, the particles are put in a grid of cells of
+                this size after each logic step, and only the particles in
+                cells that intersect the clip rect of the surface are drawn.
+            world_bounds: if set, particles that are completely outside of
+                this rect die.
+            accumulation: if set, translucent particles are composited
+                through this buffer instead of being blended one by one.
+            budget: if set, the time spent in logic and draw is measured
+                and the quality is lowered to stay in the budget.
+        """
+        super().__init__(particles)
+        self.stamps = stamps
+        self.recycle = recycle
+        self.accumulation = accumulation
+        self.budget = budget
+        self.stats: Optional[SystemStats] = None
+
+        self.cell_size = cell_size
+        self.world_bounds = None if world_bounds is None else pygame.Rect(world_bounds)
+        self.grid = SpatialHash(cell_size or 1)
+        self._grid_len = 0
+        self._grid_margin = 0
+
+    def enable_stats(self) -> SystemStats:
+        """Start to measure what the system spends its time on."""
+
+        self.stats = SystemStats()
+        # Shadows set.add and set.update, so that it costs nothing when stats are off.
+        self.add = self._add_with_stats
+        self.update = self._update_with_stats
+        return self.stats
+
+    def disable_stats(self):
+        self.stats = None
+        self.__dict__.pop('add', None)
+        self.__dict__.pop('update', None)
+
+    def _add_with_stats(self, particle):
+        set.add(self, particle)
+        self.stats.spawned[particle.__class__.__name__] += 1
+
+    def _update_with_stats(self, particles):
+        for particle in particles:
+            self._add_with_stats(particle)
+
     def logic(self):
         """Update all the particle for the frame."""
 
+        start = perf_counter_ns()
+
+        if self.stats is not None:
+            self._logic_with_stats()
+        else:
+            self._apply_forces()
+
+            dead = set()
+            for particle in self:
+                particle.logic()
+                if not particle.alive:
+                    dead.add(particle)
+
+            self._remove(dead)
+
+        if self.budget is not None:
+            self.budget.spent(perf_counter_ns() - start)
+
+    def _cap_population(self) -> set:
+        """Remove and return the oldest particles above the population cap of the budget."""
+
+        cap = self.budget.population_cap
+        if cap is None or len(self) <= cap:
+            return set()
+
+        oldest = set(heapq.nlargest(len(self) - cap, self, key=attrgetter('life_prop')))
+        self.difference_update(oldest)
+        return oldest
+
+    def _apply_forces(self, stats: Optional[SystemStats] = None):
+        """Apply each force to the particles that share it."""
+
+        affected = defaultdict(list)
+        for particle in self:
+            for force in particle.forces:
+                affected[force].append(particle)
+
+        for force, particles in affected.items():
+            start = perf_counter_ns()
+            force.apply(particles)
+            if stats is not None:
+                stats.animation_ns[repr(force)] += perf_counter_ns() - start
+
+    def _logic_with_stats(self):
+        stats = self.stats
+        logic_ns = stats.logic_ns
+        animation_ns = stats.animation_ns
+
+        self._apply_forces(stats)
+
         dead = set()
         for particle in self:
-            particle.logic()
-            if not particle.alive:
+            name = particle.__class__.__name__
+            start = perf_counter_ns()
+            particle.move()
+            if particle.alive:
+                for anim in particle.animations:
+                    anim_start = perf_counter_ns()
+                    anim(particle)
+                    animation_ns[animation_name(anim)] += perf_counter_ns() - anim_start
+            else:
                 dead.add(particle)
+            logic_ns[name] += perf_counter_ns() - start
+
+        dead = self._remove(dead)
+        stats.alive = Counter(particle.__class__.__name__ for particle in self)
+        stats.end_frame(dead)
+
+    def _remove(self, dead):
+        """
+        Remove the dead particles, those out of the world and those above
+        the population cap of the budget, then update the grid.
+        """
 
         self.difference_update(dead)
 
-    def draw(self, surf: pygame.Surface):
-        """Draw all the particles"""
+        if self.world_bounds is not None:
+            left, top, right, bottom = self.world_bounds
+            right += left
+            bottom += top
+            gone = {
+                p for p in self
+                if p.pos.x + p.extent() < left or p.pos.x - p.extent() > right
+                or p.pos.y + p.extent() < top or p.pos.y - p.extent() > bottom
+            }
+            self.difference_update(gone)
+            dead |= gone
+
+        if self.budget is not None:
+            dead |= self._cap_population()
+
+        if self.cell_size:
+            self._update_grid()
+
+        if self.recycle:
+            for particle in dead:
+                particle.recycle()
+
+        return dead
+
+    def _update_grid(self):
+        self.grid = SpatialHash(self.cell_size, self)
+        self._grid_len = len(self)
+        self._grid_margin = max((particle.extent() for particle in self), default=0)
+
+    def visible(self, rect) -> List['Particle']:
+        """All the particles in the cells that intersect the rect."""
+
+        if self._grid_len != len(self):
+            # Particles were added since the last logic step
+            self._update_grid()
+
+        margin = 2 * self._grid_margin
+        return self.grid.in_rect(pygame.Rect(rect).inflate(margin, margin))
+
+    def _to_draw(self, surf: pygame.Surface):
+        if self.cell_size:
+            return self.visible(surf.get_clip())
+        return self
+
+    def draw(self, surf: pygame.Surface, interpolation=1.0):
+        """Draw all the particles, see :func:`draw_particles` for the interpolation."""
+
+        start = perf_counter_ns()
+        particles = self._to_draw(surf)
+        if self.budget is not None and self.budget.lod_size > 1:
+            # Small particles are not interpolated, it would not show.
+            particles = self.budget.draw_small(particles, surf)
+
+        if self.stats is not None:
+            self._draw_with_stats(particles, surf, interpolation)
+        else:
+            draw_particles(particles, surf, self.stamps, interpolation, self.accumulation)
+
+        if self.budget is not None:
+            self.budget.spent(perf_counter_ns() - start)
+            self.budget.end_frame()
+
+    def _draw_with_stats(self, particles, surf: pygame.Surface, interpolation):
+        draw_ns = self.stats.draw_ns
+        stamped = Counter()
+
+        if interpolation != 1:
+            particles = interpolated(particles, interpolation)
+        if self.accumulation is not None:
+            particles = self.accumulation.filter(particles)
+
+        outlined = Counter()
+        polygons = PolygonBatch()
+        blits = []
+        for particle in particles:
+            name = particle.__class__.__name__
+            start = perf_counter_ns()
+            stamp = None if self.stamps is None else particle.stamp(self.stamps)
+            if stamp is not None:
+                blits.append(stamp)
+                stamped[name] += 1
+            elif polygons.add(particle):
+                outlined[name] += 1
+            else:
+                particle.draw(surf)
+            draw_ns[name] += perf_counter_ns() - start
+
+        # The time of batched draws is shared between the classes in the batch
+        start = perf_counter_ns()
+        polygons.fill(surf)
+        duration = perf_counter_ns() - start
+        for name, count in outlined.items():
+            draw_ns[name] += duration * count // sum(outlined.values())
+
+        start = perf_counter_ns()
+        surf.blits(blits, doreturn=False)
+        duration = perf_counter_ns() - start
+        for name, count in stamped.items():
+            draw_ns[name] += duration * count // len(blits)
+
+        if self.accumulation is not None:
+            start = perf_counter_ns()
+            self.accumulation.composite(surf)
+            draw_ns[AccumulationBuffer.__name__] += perf_counter_ns() - start
+
+
+def advance_rows(columns, groups, start, stop):
+    """
+    Move the rows start:stop of the columns of an ArrayParticleSystem
+    and apply the animations of their group.
+
+    Args:
+        columns: an object with the same column attributes as ArrayParticleSystem
+        groups: animations of each group of particles
+    Returns:
+        Which of the rows are still alive.
+    """
+
+    rows = slice(start, stop)
+    pos = columns.pos[rows]
+    speed = columns.speed[rows]
+    angle = columns.angle[rows]
+
+    columns.prev_pos[rows] = pos
+    columns.life_prop[rows] += 1 / columns.lifespan[rows]
+    speed += columns.acc[rows]
+    angle += columns.angle_vel[rows]
+    rad = angle * radians
+    pos[:, 0] += np.cos(rad) * speed
+    pos[:, 1] += np.sin(rad) * speed
+    columns.inner_rotation[rows] += columns.inner_rotation_speed[rows]
+
+    alive = (speed >= 0) & (columns.size[rows] > 0) & (columns.life_prop[rows] < 1)
+
+    group = columns.group[rows]
+    for gid, animations in enumerate(groups):
+        if animations:
+            animated = np.flatnonzero(alive & (group == gid))
+            if len(animated):
+                animated += start
+                for anim in animations:
+                    anim.apply_columns(columns, animated)
+
+    return alive
+
+
+class ArrayParticleSystem:
+    """
+    A particle system that stores the state of its particles in NumPy columns.
+
+    The particles are still created with their Builder and added one by one,
+    but their motion is computed for the whole population at once. The
+    particle objects are only used to hold what does not change (shape, color...)
+    and are synced back from the columns when they are drawn or iterated over.
+
+    Particles that share the same set of :class:`Animation` are grouped
+    and each animation is applied to the whole group at once. Particles
+    with other animation functions are synced to their object, animated
+    and read back each frame. Forces are not applied.
+    """
+
+    COLUMNS = ('speed', 'angle', 'acc', 'angle_vel', 'size', 'lifespan',
+               'life_prop', 'inner_rotation', 'inner_rotation_speed', 'alpha',
+               'initial_size')
+    LAYOUT = {
+        'pos': ((2,), float),
+        'prev_pos': ((2,), float),
+        'particles': ((), object),
+        'group': ((), int),
+        **dict.fromkeys(COLUMNS, ((), float)),
+    }
+    """Shape of one row and dtype of each column."""
+
+    CUSTOM_GROUP = -1
+
+    def __init__(self, capacity=1024, stamps: Optional[StampCache] = None, recycle=True,
+                 accumulation: Optional[AccumulationBuffer] = None):
+        self.stamps = stamps
+        self.recycle = recycle
+        self.accumulation = accumulation
+        self._n = 0
+        self.capacity = capacity
+        for name in self.LAYOUT:
+            setattr(self, name, self._new_column(name, capacity))
+        self.groups = [()]
+        self._group_ids = {(): 0}
+
+    def __len__(self):
+        return self._n
+
+    def __iter__(self):
+        self._sync_out(slice(0, self._n))
+        return iter(self.particles[:self._n].tolist())
+
+    def _new_column(self, name, capacity):
+        shape, dtype = self.LAYOUT[name]
+        return np.empty((capacity,) + shape, dtype=dtype)
+
+    def _grow(self, capacity):
+        for name in self.LAYOUT:
+            old = getattr(self, name)
+            new = self._new_column(name, capacity)
+            new[:self._n] = old[:self._n]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def add(self, particle: 'Particle'):
+        if self._n == self.capacity:
+            self._grow(max(16, 2 * self.capacity))
+
+        self.particles[self._n] = particle
+        self.group[self._n] = self._group_of(particle.animations)
+        self._sync_in((self._n,))
+        self._n += 1
+
+    def _group_of(self, animations):
+        """Id of the group of particles sharing these animations."""
+
+        if not all(isinstance(anim, Animation) for anim in animations):
+            return self.CUSTOM_GROUP
+
+        animations = tuple(animations)
+        try:
+            return self._group_ids[animations]
+        except KeyError:
+            self.groups.append(animations)
+            gid = self._group_ids[animations] = len(self.groups) - 1
+            return gid
+
+    def update(self, particles):
+        for particle in particles:
+            self.add(particle)
+
+    def clear(self):
+        self.particles[:self._n] = None
+        self._n = 0
+
+    def _sync_in(self, rows):
+        """Read the state of the particle objects into the given rows."""
+
+        for i in rows:
+            p = self.particles[i]
+            self.pos[i] = p.pos
+            self.prev_pos[i] = p.prev_pos
+            for name in self.COLUMNS:
+                getattr(self, name)[i] = getattr(p, name)
+
+    def _sync_out(self, rows):
+        """Write the state of the given rows back in their particle objects."""
+
+        columns = zip(
+            self.particles[rows].tolist(),
+            self.pos[rows].tolist(),
+            self.prev_pos[rows].tolist(),
+            self.speed[rows].tolist(),
+            self.angle[rows].tolist(),
+            self.size[rows].tolist(),
+            self.life_prop[rows].tolist(),
+            self.inner_rotation[rows].tolist(),
+            self.alpha[rows].tolist(),
+        )
+        for p, pos, prev_pos, speed, angle, size, life_prop, inner_rotation, alpha in columns:
+            p.pos.update(pos)
+            p.prev_pos.update(prev_pos)
+            p.speed = speed
+            p.angle = angle
+            p.size = size
+            p.life_prop = life_prop
+            p.inner_rotation = inner_rotation
+            p.alpha = int(alpha)
+
+    def logic(self):
+        """Update all the particle for the frame."""
+
+        alive = advance_rows(self, self.groups, 0, self._n)
+        self._animate_custom(alive)
+        self._compact(alive)
+
+    def _animate_custom(self, alive):
+        """Slow path, for animations we know nothing about."""
+
+        rows = np.flatnonzero(alive & (self.group[:self._n] == self.CUSTOM_GROUP))
+        if len(rows):
+            self._sync_out(rows)
+            for particle in self.particles[rows].tolist():
+                for anim in particle.animations:
+                    anim(particle)
+            self._sync_in(rows.tolist())
+
+    def _compact(self, alive):
+        """Remove all the dead rows at once."""
+
+        n = self._n
+        kept = int(np.count_nonzero(alive))
+        if kept == n:
+            return
+
+        if self.recycle:
+            for particle in self.particles[:n][~alive].tolist():
+                particle.recycle()
+
+        for name in self.LAYOUT:
+            column = getattr(self, name)
+            column[:kept] = column[:n][alive]
+        self.particles[kept:n] = None
+        self._n = kept
+
+    def draw(self, surf: pygame.Surface, interpolation=1.0):
+        """Draw all the particles, see :func:`draw_particles` for the interpolation."""
+
+        draw_particles(self, surf, self.stamps, interpolation, self.accumulation)
+
+
+def _shard_worker(pipe):
+    """Advance the shards of a ShardedParticleSystem that the main process sends."""
+
+    from multiprocessing.shared_memory import SharedMemory
+
+    memory = {}
+    columns = None
+    groups = []
+
+    while True:
+        message = pipe.recv()
+        command = message[0]
+
+        if command == 'step':
+            _, start, stop = message
+            try:
+                columns.alive[start:stop] = advance_rows(columns, groups, start, stop)
+            except Exception as e:
+                pipe.send(e)
+            else:
+                pipe.send(None)
+        elif command == 'groups':
+            groups.extend(message[1])
+        elif command == 'attach':
+            columns = None
+            for shm in memory.values():
+                shm.close()
+            memory = {name: SharedMemory(shm_name) for name, shm_name, _, _ in message[1]}
+            columns = SimpleNamespace(**{
+                name: np.ndarray(shape, dtype, buffer=memory[name].buf)
+                for name, _, shape, dtype in message[1]
+            })
+        elif command == 'stop':
+            columns = None
+            for shm in memory.values():
+                shm.close()
+            return
+
+
+class ShardedParticleSystem(ArrayParticleSystem):
+    """
+    An ArrayParticleSystem whose rows are advanced by worker processes.
+
+    The numeric columns live in shared memory. Each frame, the rows are
+    split in one contiguous shard per worker, and the main process only
+    waits for them, runs the custom animations and draws. Each row goes
+    through the same operations as in an ArrayParticleSystem, so the
+    results are identical for a given seed.
+
+    Call close() or use it as a context manager to stop the workers.
+    """
+
+    LAYOUT = {**ArrayParticleSystem.LAYOUT, 'alive': ((), bool)}
+
+    MIN_SHARD_ROWS = 4096
+    """Below this many rows per worker, the main process does the work alone."""
+
+    def __init__(self, workers: Optional[int] = None, capacity=1024,
+                 stamps: Optional[StampCache] = None, recycle=True,
+                 accumulation: Optional[AccumulationBuffer] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self._memory = {}
+        self._new_memory = {}
+        super().__init__(capacity, stamps, recycle, accumulation)
+        self._memory, self._new_memory = self._new_memory, {}
+
+        self._pipes = []
+        self._processes = []
+        for _ in range(self.workers):
+            pipe, child_pipe = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_shard_worker, args=(child_pipe,), daemon=True)
+            process.start()
+            child_pipe.close()
+            self._pipes.append(pipe)
+            self._processes.append(process)
+
+        self._groups_sent = 0
+        self._attach_workers()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _new_column(self, name, capacity):
+        shape, dtype = self.LAYOUT[name]
+        if dtype is object:
+            return super()._new_column(name, capacity)
+
+        from multiprocessing.shared_memory import SharedMemory
+
+        shape = (capacity,) + shape
+        dtype = np.dtype(dtype)
+        shm = SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+        self._new_memory[name] = shm
+        return np.ndarray(shape, dtype, buffer=shm.buf)
+
+    def _grow(self, capacity):
+        old_memory = self._memory
+        super()._grow(capacity)
+        self._memory, self._new_memory = self._new_memory, {}
+        self._attach_workers()
+        self._free(old_memory)
+
+    def _attach_workers(self):
+        columns = [
+            (name, shm.name, getattr(self, name).shape, getattr(self, name).dtype.str)
+            for name, shm in self._memory.items()
+        ]
+        for pipe in self._pipes:
+            pipe.send(('attach', columns))
+
+    @staticmethod
+    def _free(memory):
+        for shm in memory.values():
+            shm.close()
+            shm.unlink()
+
+    def _send_groups(self):
+        if self._groups_sent < len(self.groups):
+            new_groups = self.groups[self._groups_sent:]
+            for pipe in self._pipes:
+                pipe.send(('groups', new_groups))
+            self._groups_sent = len(self.groups)
+
+    def logic(self):
+        """Update all the particle for the frame."""
+
+        n = self._n
+        shards = min(self.workers, n // self.MIN_SHARD_ROWS)
+        if shards <= 1:
+            return super().logic()
+
+        self._send_groups()
+        bounds = np.linspace(0, n, shards + 1).astype(int).tolist()
+        for pipe, start, stop in zip(self._pipes, bounds, bounds[1:]):
+            pipe.send(('step', start, stop))
+
+        errors = [pipe.recv() for pipe in self._pipes[:shards]]
+        for error in errors:
+            if error is not None:
+                raise error
+
+        alive = self.alive[:n].copy()
+        self._animate_custom(alive)
+        self._compact(alive)
+
+    def close(self):
+        """Stop the workers and free the shared memory."""
+
+        for pipe in self._pipes:
+            pipe.send(('stop',))
+        for process in self._processes:
+            process.join()
+        self._pipes = []
+        self._processes = []
+
+        self.clear()
+        for name in self._memory:
+            setattr(self, name, None)
+        self._free(self._memory)
+        self._memory = {}
+
+
+class FixedTimestep:
+    """
+    Run the logic at a fixed rate, whatever the frame rate.
+
+    Each frame, :meth:`update` runs as many logic steps as the elapsed time
+    asks for, so the simulation goes at the same speed when frames are slow.
+    :attr:`interpolation` is how far we are between the last two steps,
+    to draw the particles in between.
+    """
+
+    def __init__(self, rate=60, max_steps=5):
+        self.dt = 1 / rate
+        self.max_steps = max_steps
+        """Most steps run in one update. The rest of the time is dropped."""
+        self.accumulator = 0.0
+        self.last = None
+
+    @property
+    def interpolation(self) -> float:
+        return self.accumulator / self.dt
+
+    def reset(self):
+        """Forget the time elapsed since the last update, after a pause for instance."""
+        self.last = None
+
+    def update(self, logic: Callable[[], None]) -> int:
+        """Call logic() once for each step since the last update. Returns the number of steps."""
+
+        now = perf_counter()
+        if self.last is not None:
+            self.accumulator += now - self.last
+        self.last = now
+
+        steps = 0
+        while self.accumulator >= self.dt and steps < self.max_steps:
+            logic()
+            self.accumulator -= self.dt
+            steps += 1
+
+        if self.accumulator >= self.dt:
+            # Too far behind: slow down instead of spiraling into more and more steps.
+            self.accumulator %= self.dt
+
+        return steps
+
+
+RNG = np.random.default_rng()
+"""Random generator of the distributions. Replace it to seed them."""
 
-        for particle in self:
-            particle.draw(surf)
+
+def param(value):
+    """Parameters of distributions can be functions, called once per batch."""
+    return value() if callable(value) else value
+
+
+class Distribution:
+    """The random values of an attribute in a :class:`ParticleTemplate`."""
+
+    def sample(self, n: int) -> list:
+        raise NotImplementedError()
+
+
+class Gauss(Distribution):
+    def __init__(self, mu, sigma):
+        self.mu = mu
+        self.sigma = sigma
+
+    def sample(self, n):
+        return RNG.normal(param(self.mu), param(self.sigma), n).tolist()
+
+
+class Uniform(Distribution):
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+
+    def sample(self, n):
+        return RNG.uniform(param(self.a), param(self.b), n).tolist()
+
+
+class Choice(Distribution):
+    def __init__(self, options):
+        self.options = list(options)
+
+    def sample(self, n):
+        options = self.options
+        return [options[i] for i in RNG.integers(len(options), size=n).tolist()]
+
+
+class PerBatch(Distribution):
+    """The same value for the whole batch, given by a function."""
+
+    def __init__(self, func: Callable):
+        self.func = func
+
+    def sample(self, n):
+        return [self.func()] * n
+
+
+def sample(value, n: int) -> list:
+    """
+    n values of an argument of a template.
+
+    Distributions are sampled, tuples are sampled element-wise
+    and anything else is the same for all particles.
+    """
+
+    if isinstance(value, Distribution):
+        return value.sample(n)
+    if isinstance(value, tuple) and any(isinstance(v, Distribution) for v in value):
+        return list(zip(*(sample(v, n) for v in value)))
+    return [value] * n
+
+
+class ParticleTemplate(Generic[P]):
+    """
+    A Builder chain written once, to create particles by batches.
+
+    It is used like the Builder of the particle type, but any argument can be
+    a :class:`Distribution`. The distributions are sampled for the whole
+    batch at once, then the recorded Builder methods are applied to each particle.
+
+    Example:
+        ParticleTemplate(PolygonParticle, Choice((3, 4, 5)))
+            .at((Uniform(0, 800), 610), Gauss(-90, 5))
+            .velocity(Gauss(3, 0.5))
+            .anim_fade()
+    """
+
+    def __init__(self, particle_type: Type[P], *args, **kwargs):
+        self.particle_type = particle_type
+        self.args = args
+        self.kwargs = kwargs
+        self.calls = []
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        method = getattr(self.particle_type.Builder, name)
+
+        def record(*args, **kwargs):
+            self.calls.append((method, args, kwargs))
+            return self
+
+        return record
+
+    @staticmethod
+    def _sampled(args, kwargs, n: int):
+        """Yield the args and kwargs of each of the n particles, with their distributions sampled."""
+
+        names = list(kwargs)
+        columns = [sample(arg, n) for arg in args] + [sample(kwargs[name], n) for name in names]
+        for values in zip(*columns):
+            yield values[:len(args)], dict(zip(names, values[len(args):]))
+
+    def build(self, n: int) -> List[P]:
+        """Create n particles."""
+
+        if not n:
+            return []
+
+        if self.args or self.kwargs:
+            particles = [self.particle_type(*args, **kwargs)
+                         for args, kwargs in self._sampled(self.args, self.kwargs, n)]
+        else:
+            particles = [self.particle_type() for _ in range(n)]
+
+        builders = [self.particle_type.Builder(particle) for particle in particles]
+        for method, args, kwargs in self.calls:
+            if args or kwargs:
+                for builder, (values, named) in zip(builders, self._sampled(args, kwargs, n)):
+                    method(builder, *values, **named)
+            else:
+                for builder in builders:
+                    method(builder)
+
+        return particles
 
 
 class ParticleFountain:
     def __init__(self, system: ParticleSystem,
-                 particle_generator: Callable[[], 'Particle'],
+                 particle_generator: Union[Callable[[], 'Particle'], ParticleTemplate],
                  frequency=1.0):
+        """
+        Create particles in a system each frame.
+
+        Args:
+            particle_generator: a function creating one particle, or a template
+                to create all the particles of the frame in one batch.
+            frequency: average number of particles per frame, scaled by the
+                quality of the budget of the system, if it has one.
+        """
         self.system = system
         self.generator = particle_generator
         self.frequency = frequency
 
     def logic(self):
-        for _ in rrange(self.frequency):
+        frequency = self.frequency
+        budget = getattr(self.system, 'budget', None)
+        if budget is not None:
+            frequency *= budget.quality
+
+        if isinstance(self.generator, ParticleTemplate):
+            self.system.update(self.generator.build(len(rrange(frequency))))
+            return
+
+        for _ in rrange(frequency):
             self.system.add(self.generator())
 
 
 class Particle:
+    __slots__ = ('pos', 'prev_pos', 'speed', 'angle', 'acc', 'angle_vel', 'size', 'initial_size',
+                 'lifespan', 'inner_rotation', 'inner_rotation_speed', 'alpha',
+                 'life_prop', 'alive', 'animations', 'forces')
+
+    def __new__(cls, *args, **kwargs):
+        pool = POOLS[cls]
+        if pool:
+            return pool.pop()
+
+        particle = super().__new__(cls)
+        particle.allocate()
+        return particle
+
+    def allocate(self):
+        """Create the objects that are reused each time the particle is recycled."""
+        self.pos = Vector2()
+        self.prev_pos = Vector2()
+        self.animations = []
+        self.forces = []
+
+    def recycle(self):
+        """
+        Put the particle back in the pool of its class.
+
+        The next particle of this class created will be this one,
+        so it must not be used anymore.
+        """
+        pool = POOLS[self.__class__]
+        if len(pool) < MAX_POOL_SIZE:
+            pool.append(self)
+
     def __init__(self):
-        self.pos = Vector2(0, 0)
+        self.pos.update(0, 0)
+        self.prev_pos.update(0, 0)
         self.speed = 3.0
         self.angle = -90
         self.acc = 0.0
         self.angle_vel = 0.0
         self.size = 10.0
+        self.initial_size = self.size
         self.lifespan = 60
 
         self.inner_rotation = 0
@@ -95,8 +1754,9 @@ class Particle:
 
         self.life_prop = 0.0
         self.alive = True
-        self.animations = []
-        
+        self.animations.clear()
+        self.forces.clear()
+
     # Builder methods
 
     class Builder(Generic[P]):
@@ -115,7 +1775,8 @@ class Particle:
                 The particle being build.
             """
 
-            self._p.pos = Vector2(pos)
+            self._p.pos.update(pos)
+            self._p.prev_pos.update(pos)
             self._p.angle = angle
             return self
 
@@ -156,36 +1817,43 @@ class Particle:
             return self
 
         def anim_fade(self):
-            def fade(particle):
-                alpha = int(255 * (1 - particle.life_prop))
-                particle.alpha = alpha
-            return self.anim(fade)
+            return self.anim(FADE)
 
         def anim_blink(self):
-            def blink(particle):
-                a = 1 - abs(1 - 2 * particle.life_prop)
-                particle.alpha = int(255 * a ** 2)
-            return self.anim(blink)
+            return self.anim(BLINK)
+
+        def anim_shrink(self):
+            """Shrink the particle from its current size to zero over its life."""
+            self._p.initial_size = self._p.size
+            return self.anim(SHRINK)
 
         def anim_bounce_rect(self, rect):
             """Make the particle bounce inside of the rectangle."""
+            return self.anim(bounce_rect(tuple(pygame.Rect(rect))))
 
-            rect = pygame.Rect(rect)
+        def force(self, force: 'Force'):
+            """Apply a force to the particle, before it moves each frame."""
+            self._p.forces.append(force)
+            return self
 
-            def bounce_rect(particle):
-                angle = particle.angle % 360
-                if particle.pos.x - particle.size < rect.left and 90 < angle < 270:
-                    particle.angle = 180 - angle
-                elif particle.pos.x + particle.size > rect.right and (angle < 90 or angle > 270):
-                    particle.angle = 180 - angle
+        def attracted_to(self, point, strength: float):
+            """
+            Pull the particle towards a point, at strength px/frame².
 
-                angle = particle.angle % 360
-                if particle.pos.y - particle.size < rect.top and angle > 180:
-                    particle.angle = -angle
-                elif particle.pos.y + particle.size > rect.bottom and angle < 180:
-                    particle.angle = -angle
+            Args:
+                point: a position, or a function returning it each frame, like pygame.mouse.get_pos
+            """
+            if not callable(point):
+                point = tuple(point)
+            return self.force(attractor(point, strength))
+
+        def repelled(self, radius: float, strength: float):
+            """Push away the particles with the same parameters that are closer than radius."""
+            return self.force(repulsion(radius, strength))
 
-            return self.anim(bounce_rect)
+        def flocking(self, radius: float, separation=0.05, alignment=0.05, cohesion=0.005):
+            """Flock with the particles with the same parameters that are closer than radius."""
+            return self.force(flocking(radius, separation, alignment, cohesion))
 
         def apply(self, func):
             """Call a building function on the particle. Useful to factor parts of the build."""
@@ -203,6 +1871,15 @@ class Particle:
     def logic(self):
         """Update the attributes of the particle."""
 
+        self.move()
+        if self.alive:
+            for anim in self.animations:
+                anim(self)
+
+    def move(self):
+        """Update the attributes of the particle, without its animations."""
+
+        self.prev_pos.update(self.pos)
         self.life_prop += 1 / self.lifespan
         self.speed += self.acc
         self.angle += self.angle_vel
@@ -218,17 +1895,53 @@ class Particle:
                 or self.size <= 0 \
                 or self.life_prop >= 1:
             self.alive = False
-        else:
-            for anim in self.animations:
-                anim(self)
 
     def draw(self, surf):
         raise NotImplementedError()
 
+    def extent(self) -> float:
+        """How far from its position the particle can be drawn."""
+        return self.size
+
+    def stamp(self, stamps: StampCache) -> Optional[Tuple[pygame.Surface, Tuple[int, int]]]:
+        """
+        The pre-rasterized surface of the particle and where to blit it.
+
+        Returns None when the particle has to be drawn with :meth:`draw`.
+        """
+        return None
+
+    def coverage(self) -> Optional[Tuple[Tuple[Callable, tuple], Tuple[int, int]]]:
+        """
+        Which pixels the particle covers, for an :class:`AccumulationBuffer`.
+
+        Returns a rasterize function with its arguments, whose non transparent
+        pixels are the covered ones, and where to put them. None when the
+        particle has to be drawn with :meth:`draw`.
+        """
+        return None
+
+    def outline(self) -> Optional[Tuple[tuple, DEGREES]]:
+        """
+        The vertices of the shape of the particle, of size 1 and not rotated,
+        as from :func:`unit_polygon`, and its rotation, to draw it in a
+        :class:`PolygonBatch`. None when the particle has to be drawn with :meth:`draw`.
+        """
+        return None
+
+
+OPAQUE = (255, 255, 255, 255)
+
 
 class DrawnParticle(Particle):
+    __slots__ = ('color',)
+
+    def allocate(self):
+        super().allocate()
+        self.color = pygame.Color(0)
+
     def __init__(self, color=None):
-        self.color = pygame.Color(color or 0)
+        self.color.update(color or 0)
         super().__init__()
 
     @property
@@ -239,6 +1952,18 @@ class DrawnParticle(Particle):
     def alpha(self, value: int):
         self.color.a = value
 
+    def stamp_color(self):
+        """The color of the particle, with its alpha quantized for stamps."""
+        r, g, b, a = self.color
+        return r, g, b, StampCache.quantize_alpha(a)
+
+    @staticmethod
+    def apply_stamp_alpha(stamp: pygame.Surface, color):
+        """Make the opaque pixels of the stamp as transparent as the color."""
+        if color[3] < 255:
+            stamp.fill((255, 255, 255, color[3]), special_flags=pygame.BLEND_RGBA_MULT)
+        return stamp
+
     class Builder(Particle.Builder['DrawnParticle']):
         def hsv(self, hue, saturation=1.0, value=1.0):
             hue = round(hue) % 360
@@ -247,20 +1972,14 @@ class DrawnParticle(Particle):
             self._p.color.hsva = (hue, saturation, value, 100)
             return self
 
-        def anim_shrink(self):
-            initial_size = self._p.size
-
-            def shrink(particle):
-                particle.size = initial_size * (1 - particle.life_prop)
-
-            return self.anim(shrink)
-
     def builder(self):
         # the method is here only for type hinting
         return self.Builder(self)
 
 
 class CircleParticle(DrawnParticle):
+    __slots__ = ('filled',)
+
     def __init__(self, color=None, filled=True):
         super().__init__(color)
         self.filled = filled
@@ -275,16 +1994,58 @@ class CircleParticle(DrawnParticle):
         else:
             pygame.draw.circle(surf, self.color, self.pos, self.size, 1 - self.filled)
 
+    def stamp(self, stamps):
+        color = self.stamp_color()
+        radius = int(self.size)
+        key = (self.__class__, self.filled, radius, color)
+        stamp = stamps.get(key, self.rasterize, radius, self.filled, color)
+        return stamp, (int(self.pos.x) - radius, int(self.pos.y) - radius)
+
+    def coverage(self):
+        if not self.filled:
+            return None
+        radius = int(self.size)
+        return (self.rasterize, (radius, True, OPAQUE)), (int(self.pos.x) - radius, int(self.pos.y) - radius)
+
+    @classmethod
+    def rasterize(cls, radius, filled, color):
+        stamp = pygame.Surface((2 * radius + 1, 2 * radius + 1), pygame.SRCALPHA)
+        if filled:
+            gfx.filled_circle(stamp, radius, radius, radius, color[:3])
+        else:
+            gfx.circle(stamp, radius, radius, radius, color[:3])
+        return cls.apply_stamp_alpha(stamp, color)
+
 
 class SquareParticle(DrawnParticle):
+    __slots__ = ()
+
     def draw(self, surf):
         if self.color.a < 255:
             gfx.box(surf, (self.pos, (self.size, self.size)), self.color)
         else:
             pygame.draw.rect(surf, self.color, (self.pos, (self.size, self.size)))
 
+    def stamp(self, stamps):
+        color = self.stamp_color()
+        side = max(0, int(self.size))
+        stamp = stamps.get((self.__class__, side, color), self.rasterize, side, color)
+        return stamp, (int(self.pos.x), int(self.pos.y))
+
+    def coverage(self):
+        side = max(0, int(self.size))
+        return (self.rasterize, (side, OPAQUE)), (int(self.pos.x), int(self.pos.y))
+
+    @classmethod
+    def rasterize(cls, side, color):
+        stamp = pygame.Surface((side, side), pygame.SRCALPHA)
+        stamp.fill(color)
+        return stamp
+
 
 class PolygonParticle(DrawnParticle):
+    __slots__ = ('vertex_step', 'vertices')
+
     def __init__(self, vertices: int, color=None, vertex_step: int=1):
         """
         A particle shaped in a regular polygon.
@@ -303,15 +2064,37 @@ class PolygonParticle(DrawnParticle):
         self.vertices = vertices
 
     def draw(self, surf):
-        points = [
-            self.pos + polar(self.size, self.inner_rotation + i * 360 / self.vertices * self.vertex_step)
-            for i in range(self.vertices)
-        ]
-
+        points = outline_points(unit_polygon(self.vertices, self.vertex_step),
+                                self.pos.x, self.pos.y, self.size, self.inner_rotation)
         gfx.filled_polygon(surf, points, self.color)
 
+    def outline(self):
+        return unit_polygon(self.vertices, self.vertex_step), self.inner_rotation
+
+    def stamp(self, stamps):
+        color = self.stamp_color()
+        radius = round(self.size)
+        # Rotating by this angle gives the same polygon
+        period = 360 * gcd(self.vertices, self.vertex_step) / self.vertices
+        rotation = StampCache.quantize_rotation(self.inner_rotation, period)
+
+        key = (self.__class__, self.vertices, self.vertex_step, radius, rotation, color)
+        stamp = stamps.get(key, self.rasterize, self.vertices, self.vertex_step, radius,
+                           rotation * period / StampCache.ROTATION_STEPS, color)
+        return stamp, (int(self.pos.x) - radius - 1, int(self.pos.y) - radius - 1)
+
+    @classmethod
+    def rasterize(cls, vertices, vertex_step, radius, rotation, color):
+        stamp = pygame.Surface((2 * radius + 3, 2 * radius + 3), pygame.SRCALPHA)
+        points = outline_points(unit_polygon(vertices, vertex_step),
+                                radius + 1, radius + 1, radius, rotation)
+        gfx.filled_polygon(stamp, points, color[:3])
+        return cls.apply_stamp_alpha(stamp, color)
+
 
 class ShardParticle(DrawnParticle):
+    __slots__ = ('tail', 'head')
+
     def __init__(self, color=None, head=1, tail=3):
         """A shard shaped particle, inspired from DaFluffyPtato.
 
@@ -325,21 +2108,20 @@ class ShardParticle(DrawnParticle):
         self.head = head
 
     def draw(self, surf):
-        vel = polar(self.speed, self.angle)
-        vel.scale_to_length(self.size)
-        cross = Vector2(-vel.y, vel.x)
-
-        points = [
-            self.pos + vel * self.head,
-            self.pos + cross,
-            self.pos - vel * self.tail,
-            self.pos - cross
-        ]
-
+        points = outline_points(unit_shard(self.head, self.tail),
+                                self.pos.x, self.pos.y, self.size, self.angle)
         gfx.filled_polygon(surf, points, self.color)
 
+    def outline(self):
+        return unit_shard(self.head, self.tail), self.angle
+
+    def extent(self):
+        return self.size * max(self.head, self.tail, 1)
+
 
 class LineParticle(DrawnParticle):
+    __slots__ = ('length', 'width')
+
     def __init__(self, length, color=None, width=1):
         self.length = length
         self.width = width
@@ -349,14 +2131,20 @@ class LineParticle(DrawnParticle):
         end = vec2int(self.pos - polar(self.length, self.angle))
         start = vec2int(self.pos)
         gfx.line(surf, *start, *end, self.color)
+
+    def extent(self):
+        return self.length
         
 
 class ImageParticle(Particle):
+    __slots__ = ('_alpha', '_size', 'original_surf', 'need_redraw', 'surf')
+
     def __init__(self, surf: pygame.Surface):
         self._alpha = 255
+        self._size = 0
         self.original_surf = surf
         self.need_redraw = True
-        self.surf = pygame.Surface((1, 1))
+        self.surf = None
 
         super().__init__()
 
@@ -367,50 +2155,52 @@ class ImageParticle(Particle):
     @alpha.setter
     def alpha(self, value: int):
         self._alpha = value
-        self.surf.set_alpha(value)
+
+    @property
+    def size(self):
+        return self._size
+
+    @size.setter
+    def size(self, value: float):
+        if value != self._size:
+            self._size = value
+            self.need_redraw = True
+
+    def extent(self):
+        w, h = self.original_surf.get_size()
+        return self.size * max(w, h) / min(w, h) / 2
 
     def redraw(self):
+        """The scaled surface of the particle. It is shared with other particles."""
+
         self.need_redraw = False
         w, h = self.original_surf.get_size()
         ratio = self.size / min(w, h)
-        surf = pygame.transform.scale(self.original_surf, vec2int((w * ratio, h * ratio)))
-
-        surf.set_alpha(self.alpha)
-        return surf
+        return SCALED_SURFACES.get(self.original_surf, vec2int((w * ratio, h * ratio)))
 
     def draw(self, surf: pygame.Surface):
         if self.need_redraw:
             self.surf = self.redraw()
 
+        # The surface is shared, so its alpha is only ours until the blit.
+        self.surf.set_alpha(self._alpha)
         surf.blit(self.surf, self.surf.get_rect(center=self.pos))
 
-    class Builder(Particle.Builder):
-        def anim_shrink(self):
-            initial_size = self._p.size
-
-            def shrink(particle):
-                size = initial_size * (1 - particle.life_prop)
-                if size != int(particle.size):
-                    particle.need_redraw = True
-                    particle.size = size
-
-            return self.anim(shrink)
-
-    def builder(self):
-        # the method is here only for type hinting
-        return self.Builder(self)
 
+def demo_fountains(particles, size, frame: Callable[[], int], mouse: Callable[[], VEC2D]):
+    """
+    The fountains of the demo.
 
-def main():
-    SIZE = (1300, 800)
-    display = pygame.display.set_mode(SIZE, )
-    particles = ParticleSystem()
-    clock = pygame.time.Clock()
+    Args:
+        particles: the system that receives the particles
+        size: size of the screen
+        frame: function giving the current frame number
+        mouse: function giving the position of the mouse
+    """
 
-    snow = SNOW
-    snow.set_colorkey((0, 0, 0))
+    snowflake = snow()
     texts = ["Ahlan", "Asalaam alaikum", "Zdrasti", "Zdraveĭte", "Nǐ hǎo", "Nǐn hǎo", "Hallo", "Goede dag", "Hey", "Hello", "Salut", "Bonjour", "Hug", "Dia dhuit", "Hallo", "Guten tag", "Yasou", "Kalimera", "Shalom", "Shalom aleichem", "Hē", "Namastē", "Halló", "Góðan dag", "Salam!", "Selamat siang", "Ciao", "Salve", "Yā, _Yō", "Konnichiwa", "Suosdei", "Suostei", "Anyoung", "Anyoung haseyo", "Hej", "Cześć", "Cześć!", "Dzień dobry!", "Oi", "Olá", "Hei", "Bună ziua", "Privet", "Zdravstvuyte", "¿Qué tal?", "Hola", "Hujambo", "Habari", "Hej", "God dag", "Ia ora na", "Ia ora na", "Selam", "Merhaba", "Chào", "Xin chào", "Helo", "Shwmae", "Sawubona", "Ngiyakwemukela", ]
-    texts_surfs = [DEFAULT_FONT.render(text, 1, 'white') for text in texts]
+    texts_surfs = [default_font().render(text, 1, 'white') for text in texts]
 
     def base(y):
         return lambda builder: (
@@ -422,7 +2212,7 @@ def main():
                 .anim_fade()
         )
 
-    fountains = [
+    return [
         ParticleFountain(
             particles,
             lambda:
@@ -457,20 +2247,19 @@ def main():
         ),
         ParticleFountain(
             particles,
-            lambda: PolygonParticle(randint(3, 5)).builder()
-                .at((uniform(0, SIZE[0]), SIZE[1] + 10), gauss(-90, 5))
-                .velocity(gauss(3, 0.5))
-                .hsv(gauss(frame/5, 8), 1, gauss(0.9, 0.05))
-                .inner_rotation(0, gauss(0, 2))
+            ParticleTemplate(PolygonParticle, Choice((3, 4, 5)))
+                .at((Uniform(0, size[0]), size[1] + 10), Gauss(-90, 5))
+                .velocity(Gauss(3, 0.5))
+                .hsv(Gauss(lambda: frame() / 5, 8), 1, Gauss(0.9, 0.05))
+                .inner_rotation(0, Gauss(0, 2))
                 .anim_fade()
-                .anim_shrink()
-                .build(),
+                .anim_shrink(),
             15
         ),
         ParticleFountain(
             particles,
             lambda: ShardParticle('black', 2, 5).builder()
-                .at((SIZE[0], 0), uniform(90, 180))
+                .at((size[0], 0), uniform(90, 180))
                 .velocity(gauss(10, 2))
                 .living(30)
                 .sized(gauss(15, 2))
@@ -481,7 +2270,7 @@ def main():
         ParticleFountain(
             particles,
             lambda: CircleParticle('white').builder()
-                .at(pygame.mouse.get_pos(), gauss(90, 10))
+                .at(mouse(), gauss(90, 10))
                 .velocity(gauss(3, 0.5))
                 .anim_fade()
                 .build(),
@@ -490,7 +2279,7 @@ def main():
         ParticleFountain(
             particles,
             lambda: SquareParticle('white').builder()
-                .at((uniform(0, SIZE[0]), uniform(0, SIZE[1])), 0)
+                .at((uniform(0, size[0]), uniform(0, size[1])), 0)
                 .velocity(0)
                 .living(randint(100, 180))
                 .sized(uniform(1, 4))
@@ -500,7 +2289,7 @@ def main():
         ParticleFountain(
             particles,
             lambda: LineParticle(100, '#fff397', 2).builder()
-                .at(rand2d(SIZE), 30)
+                .at(rand2d(size), 30)
                 .living(60)
                 .velocity(gauss(12, 1))
                 .anim_blink()
@@ -510,7 +2299,7 @@ def main():
         ParticleFountain(
             particles,
             lambda: ImageParticle(choice(texts_surfs)).builder()
-                .at(pygame.mouse.get_pos() + Vector2(gauss(0, 30), -30), -90)
+                .at(mouse() + Vector2(gauss(0, 30), -30), -90)
                 .velocity(gauss(1, 0.2))
                 .sized(30)
                 .anim_fade()
@@ -520,8 +2309,8 @@ def main():
         ),
         ParticleFountain(
             particles,
-            lambda: ImageParticle(snow).builder()
-                .at((uniform(0, SIZE[0]), -20), gauss(75, 2))
+            lambda: ImageParticle(snowflake).builder()
+                .at((uniform(0, size[0]), -20), gauss(75, 2))
                 .sized(20)
                 .velocity(gauss(2.5, 0.1))
                 .living(240)
@@ -531,12 +2320,75 @@ def main():
         # ImageParticle(circle_surf).builder()
     ]
 
-    start = time()
+
+def click_burst(particles, pos, size):
+    """The bouncing particles spawned when the user clicks."""
+
+    budget = getattr(particles, 'budget', None)
+    quality = 1 if budget is None else budget.quality
+    for _ in range(int(200 * quality)):
+        angle = uniform(0, 360)
+        particles.add(
+            CircleParticle().builder()
+                .at(pos, angle)
+                .velocity(gauss(10, 0.5))
+                # .acceleration(-0.05)
+                .hsv(angle)
+                .anim_shrink()
+                .anim_bounce_rect(((0, 0), size))
+                .build()
+        )
+
+
+LOGIC_RATE = 60
+
+
+def main():
+    pygame.init()
+    SIZE = (1300, 800)
+    display = pygame.display.set_mode(SIZE, )
+    particles = ParticleSystem(cell_size=64, world_bounds=pygame.Rect((0, 0), SIZE).inflate(100, 100),
+                               budget=ParticleBudget(target_ms=10, max_particles=5000))
+    clock = pygame.time.Clock()
+    hud = GlyphAtlas(default_font(), 'white')
+
     frame = 0
+    fountains = demo_fountains(particles, SIZE, lambda: frame, pygame.mouse.get_pos)
+    # Fireflies that flock around the mouse
+    fountains.append(ParticleFountain(
+        particles,
+        lambda: CircleParticle().builder()
+            .at((uniform(0, SIZE[0]), SIZE[1] + 10), gauss(-90, 20))
+            .velocity(gauss(2, 0.3))
+            .hsv(gauss(50, 10), 0.6, 1)
+            .sized(3)
+            .living(600)
+            .flocking(40)
+            .attracted_to(pygame.mouse.get_pos, 0.03)
+            .anim_blink()
+            .build(),
+        0.5
+    ))
+    timestep = FixedTimestep(LOGIC_RATE)
+
+    def step():
+        nonlocal frame
+        frame += 1
+        for fountain in fountains:
+            fountain.logic()
+
+        particles.logic()
+        print('Particles:', len(particles))
+        if recorder is not None:
+            recorder.record(particles)
+
+    start = time()
+    drawn = 0
     running = True
     do_logic = True
+    recorder = None
     while running:
-        frame += 1
+        drawn += 1
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
@@ -546,38 +2398,47 @@ def main():
                     running = False
                 elif key == pygame.K_SPACE:
                     do_logic = not do_logic
+                    timestep.reset()
+                elif key == pygame.K_s:
+                    if particles.stats is None:
+                        particles.enable_stats()
+                    else:
+                        pprint(particles.stats.report(), sort_dicts=False)
+                        particles.disable_stats()
+                elif key == pygame.K_a:
+                    modes = (None,) + AccumulationBuffer.MODES
+                    mode = particles.accumulation and particles.accumulation.mode
+                    mode = modes[(modes.index(mode) + 1) % len(modes)]
+                    particles.accumulation = mode and AccumulationBuffer(mode)
+                    print('Accumulation:', mode)
+                elif key == pygame.K_r:
+                    if recorder is None:
+                        from particles_record import Recorder
+                        recorder = Recorder('recording', SIZE)
+                    else:
+                        recorder.close()
+                        print(f'Recorded {len(recorder.index) - 1} frames in {recorder.path}/')
+                        recorder = None
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                for _ in range(200):
-                    angle = uniform(0, 360)
-                    particles.add(
-                        CircleParticle().builder()
-                            .at(event.pos, angle)
-                            .velocity(gauss(10, 0.5))
-                            # .acceleration(-0.05)
-                            .hsv(angle)
-                            .anim_shrink()
-                            .anim_bounce_rect(((0, 0), SIZE))
-                            .build()
-                    )
+                click_burst(particles, event.pos, SIZE)
 
         if do_logic:
-            for fountain in fountains:
-                fountain.logic()
-
-            particles.logic()
-            print('Particles:', len(particles))
+            timestep.update(step)
 
         display.fill('#282832')
-        particles.draw(display)
+        particles.draw(display, timestep.interpolation)
 
-        s = DEFAULT_FONT.render(f'FPS: {clock.get_fps():.2f}  Particles: {len(particles)}', 1, 'white')
-        display.blit(s, (5, 5))
+        hud.draw(display, f'FPS: {clock.get_fps():.2f}  Particles: {len(particles)}  '
+                          f'Quality: {particles.budget.quality:.0%}', (5, 5))
 
         pygame.display.update()
         clock.tick(1000)
 
+    if recorder is not None:
+        recorder.close()
+
     end = time()
-    print(f'Ran for {end - start:.2f} seconds at {frame / (end - start):.2f} FPS.')
+    print(f'Ran for {end - start:.2f} seconds at {drawn / (end - start):.2f} FPS.')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+
+"""
+Headless and deterministic benchmark of the particles.py demo scenes.
+
+Each scene runs on the SDL dummy video driver, with a fixed seed and
+for a fixed number of frames. The time per frame is split between the
+fountains (spawn), ParticleSystem.logic and ParticleSystem.draw, for each
+particle class, and printed as JSON so that runs can be compared across commits:
+
+    python particles_bench.py --scene burst --system array > after.json
+
+With --imports, it checks instead that the particle modules import
+without initializing pygame, within IMPORT_BUDGET_MS of importing pygame
+and numpy, and exits with an error otherwise.
+
+To time each class apart, every class gets its own particle system,
+so with --stamps, stamps are blitted with one Surface.blits call per
+class instead of one for the whole frame.
+"""
+
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+# Keep stdout valid JSON
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import json
+import random
+import subprocess
+import sys
+from argparse import ArgumentParser
+from collections import Counter, defaultdict
+from time import perf_counter_ns
+
+import numpy as np
+import pygame
+
+import particles
+from particles import ArrayParticleSystem, ParticleSystem, click_burst, demo_fountains
+
+SIZE = (1300, 800)
+MOUSE = (SIZE[0] / 2, SIZE[1] / 2)
+BG_COLOR = '#282832'
+BURST_PERIOD = 60
+
+SYSTEMS = {
+    'set': ParticleSystem,
+    'array': ArrayParticleSystem,
+}
+SCENES = ['demo', 'burst']
+STEPS = ('spawn', 'logic', 'draw')
+IMPORTED_MODULES = ('particles', 'particles_record', 'sparkles', 'tommy')
+IMPORT_BUDGET_MS = 50
+"""How long importing a module may take once pygame and numpy are imported."""
+
+
+class ClassRouter:
+    """Sends each particle to the system of its class."""
+
+    def __init__(self, system_type, **options):
+        self.system_type = system_type
+        self.options = options
+        self.systems = {}
+        self.spawned = Counter()
+        """Number of particles added, by class name."""
+
+    def __len__(self):
+        return sum(len(system) for system in self.systems.values())
+
+    def add(self, particle):
+        name = particle.__class__.__name__
+        try:
+            system = self.systems[name]
+        except KeyError:
+            system = self.systems[name] = self.system_type(**self.options)
+        system.add(particle)
+        self.spawned[name] += 1
+
+    def update(self, particles):
+        for particle in particles:
+            self.add(particle)
+
+
+def timed_spawn(router, timings, spawn):
+    """Call spawn() and share its duration between the classes it created."""
+
+    before = router.spawned.copy()
+    start = perf_counter_ns()
+    spawn()
+    duration = perf_counter_ns() - start
+
+    created = router.spawned - before
+    total = sum(created.values())
+    for name, count in created.items():
+        timings[name]['spawn'] += duration * count / total
+
+
+def run(scene='demo', system='set', frames=600, seed=42, accumulation=None, stamps=False):
+    random.seed(seed)
+    particles.RNG = np.random.default_rng(seed)
+    particles.POOLS.clear()
+    particles.STAMPS.clear()
+    particles.SCALED_SURFACES.clear()
+
+    display = pygame.display.set_mode(SIZE)
+    options = {}
+    if accumulation is not None:
+        options['accumulation'] = particles.AccumulationBuffer(accumulation)
+    if stamps:
+        options['stamps'] = particles.STAMPS
+    router = ClassRouter(SYSTEMS[system], **options)
+    timings = defaultdict(lambda: dict.fromkeys(STEPS, 0))
+
+    frame = 0
+    fountains = demo_fountains(router, SIZE, lambda: frame, lambda: MOUSE)
+    peak = 0
+
+    for frame in range(1, frames + 1):
+        if scene == 'burst' and frame % BURST_PERIOD == 1:
+            timed_spawn(router, timings, lambda: click_burst(router, MOUSE, SIZE))
+        for fountain in fountains:
+            timed_spawn(router, timings, fountain.logic)
+
+        for name, particle_system in router.systems.items():
+            start = perf_counter_ns()
+            particle_system.logic()
+            timings[name]['logic'] += perf_counter_ns() - start
+
+        display.fill(BG_COLOR)
+        for name, particle_system in router.systems.items():
+            start = perf_counter_ns()
+            particle_system.draw(display)
+            timings[name]['draw'] += perf_counter_ns() - start
+
+        peak = max(peak, len(router))
+
+    def per_frame(ns):
+        return round(ns / frames / 1e6, 4)
+
+    classes = {}
+    for name in sorted(timings):
+        ms = {step: per_frame(timings[name][step]) for step in STEPS}
+        ms['total'] = round(sum(ms.values()), 4)
+        alive = len(router.systems[name]) if name in router.systems else 0
+        classes[name] = {
+            'spawned': router.spawned[name],
+            'alive': alive,
+            'ms_per_frame': ms,
+        }
+
+    total = {step: round(sum(c['ms_per_frame'][step] for c in classes.values()), 4)
+             for step in STEPS + ('total',)}
+
+    return {
+        'scene': scene,
+        'system': system,
+        'frames': frames,
+        'seed': seed,
+        'accumulation': accumulation,
+        'alive': len(router),
+        'peak': peak,
+        'ms_per_frame': total,
+        'stamps': {'hits': particles.STAMPS.hits, 'misses': particles.STAMPS.misses} if stamps else None,
+        'classes': classes,
+    }
+
+
+def import_time(module, runs=5):
+    """
+    Time to import the module in a new interpreter, where pygame and numpy
+    are already imported, and whether the import initialized pygame.
+    """
+
+    code = (
+        'import time, numpy, pygame\n'
+        'start = time.perf_counter()\n'
+        f'import {module}\n'
+        'print(time.perf_counter() - start, pygame.get_init(), pygame.font.get_init())'
+    )
+
+    times = []
+    initialized = False
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        duration, *init = result.stdout.split()[-3:]
+        times.append(float(duration) * 1000)
+        initialized |= 'True' in init
+
+    return {
+        'ms': round(min(times), 2),
+        'initializes_pygame': initialized,
+    }
+
+
+def check_imports():
+    """Report the import time of each module, and whether they are all in the budget."""
+
+    report = {module: import_time(module) for module in IMPORTED_MODULES}
+    ok = all(r['ms'] <= IMPORT_BUDGET_MS and not r['initializes_pygame'] for r in report.values())
+    return {'budget_ms': IMPORT_BUDGET_MS, 'ok': ok, 'modules': report}
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scene', choices=SCENES, default='demo')
+    parser.add_argument('--system', choices=list(SYSTEMS), default='set')
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--accumulation', choices=particles.AccumulationBuffer.MODES,
+                        help='Composite translucent particles through an AccumulationBuffer.')
+    parser.add_argument('--stamps', action='store_true',
+                        help='Draw through the shared StampCache, particles.STAMPS.')
+    parser.add_argument('--imports', action='store_true',
+                        help='Check the import time of the particle modules instead.')
+    parser.add_argument('--out', help='Write the JSON report to this file instead of stdout.')
+    args = parser.parse_args()
+
+    if args.imports:
+        report = check_imports()
+    else:
+        pygame.init()
+        report = run(args.scene, args.system, args.frames, args.seed, args.accumulation, args.stamps)
+    text = json.dumps(report, indent=2)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if not report.get('ok', True):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
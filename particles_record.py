@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+
+"""
+Record particle simulations and render them offline.
+
+A recording is a directory with one binary file per column (x, y, size,
+rotation, color, shape) holding the particles of every frame one after
+the other, a frame index giving where each frame starts, and a meta.json
+describing the shapes. Columns are memory-mapped when replayed.
+
+Recording only copies the state of the particles, so it is cheap enough
+to capture a busy scene in real time. Rendering can then be done at any
+resolution, on all cores:
+
+    python particles_record.py recording/ frames/ --size 1920x1080
+"""
+
+import json
+import multiprocessing
+import os
+from argparse import ArgumentParser
+from pathlib import Path
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import numpy as np
+import pygame
+
+from particles import (CircleParticle, ImageParticle, LineParticle, PolygonParticle,
+                       ShardParticle, SquareParticle, StampCache, draw_particles)
+
+COLUMNS = {
+    'x': ((), np.float32),
+    'y': ((), np.float32),
+    'size': ((), np.float32),
+    'rotation': ((), np.float32),
+    'color': ((4,), np.uint8),
+    'shape': ((), np.uint16),
+}
+INDEX = 'index.i64'
+
+
+SHAPES = {
+    'CircleParticle': lambda p: {'kind': 'circle', 'filled': p.filled},
+    'SquareParticle': lambda p: {'kind': 'square'},
+    'PolygonParticle': lambda p: {'kind': 'polygon', 'vertices': p.vertices,
+                                  'vertex_step': p.vertex_step},
+    'ShardParticle': lambda p: {'kind': 'shard', 'head': p.head, 'tail': p.tail},
+    'LineParticle': lambda p: {'kind': 'line', 'length': p.length, 'width': p.width},
+    'ImageParticle': lambda p: {'kind': 'image', 'surf': p.original_surf},
+}
+
+
+def shape_of(particle):
+    """Description of the shape of a particle, that does not change during its life."""
+
+    # Classes are matched by name, so that it also works with particles.py run as __main__.
+    for cls in type(particle).__mro__:
+        try:
+            return SHAPES[cls.__name__](particle)
+        except KeyError:
+            pass
+    raise TypeError(f'Cannot record {particle.__class__.__name__}.')
+
+
+def rotation_of(particle, shape):
+    if shape == 'polygon':
+        return particle.inner_rotation
+    return particle.angle
+
+
+def color_of(particle, shape):
+    if shape == 'image':
+        return 255, 255, 255, particle.alpha
+    return tuple(particle.color)
+
+
+class Recorder:
+    """Appends the state of the particles at each frame to a recording."""
+
+    def __init__(self, path, size):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.size = tuple(size)
+        self.files = {name: open(self.path / name, 'wb') for name in COLUMNS}
+        self.index = [0]
+        self.shapes = []
+        self._shape_ids = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _shape_id(self, particle):
+        """Id and kind of the shape of the particle."""
+
+        shape = shape_of(particle)
+        kind = shape['kind']
+        if kind == 'image':
+            key = (kind, id(shape['surf']))
+        else:
+            key = tuple(shape.values())
+
+        try:
+            return self._shape_ids[key]
+        except KeyError:
+            pass
+
+        shape_id = len(self.shapes)
+        if kind == 'image':
+            shape['file'] = f'image_{shape_id}.png'
+            self._save_image(shape.pop('surf'), self.path / shape['file'])
+        self.shapes.append(shape)
+        self._shape_ids[key] = shape_id, kind
+        return shape_id, kind
+
+    @staticmethod
+    def _save_image(surf, path):
+        # The colorkey would be lost in the png, so it is saved with per pixel alpha.
+        image = pygame.Surface(surf.get_size(), pygame.SRCALPHA)
+        image.blit(surf, (0, 0))
+        pygame.image.save(image, str(path))
+
+    def record(self, particles):
+        """Append one frame."""
+
+        rows = []
+        for p in particles:
+            shape_id, kind = self._shape_id(p)
+            rows.append((p.pos.x, p.pos.y, p.size, rotation_of(p, kind), color_of(p, kind), shape_id))
+
+        if rows:
+            for (name, (_, dtype)), column in zip(COLUMNS.items(), zip(*rows)):
+                self.files[name].write(np.array(column, dtype=dtype).tobytes())
+        self.index.append(self.index[-1] + len(rows))
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        np.array(self.index, dtype=np.int64).tofile(self.path / INDEX)
+        meta = {'size': self.size, 'frames': len(self.index) - 1, 'shapes': self.shapes}
+        (self.path / 'meta.json').write_text(json.dumps(meta, indent=2))
+
+
+class Recording:
+    """Read access to a recording, through memory-mapped columns."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        meta = json.loads((self.path / 'meta.json').read_text())
+        self.size = tuple(meta['size'])
+        self.shapes = meta['shapes']
+        self.index = np.fromfile(self.path / INDEX, dtype=np.int64)
+
+        self.columns = {}
+        for name, (shape, dtype) in COLUMNS.items():
+            if self.index[-1]:
+                self.columns[name] = np.memmap(self.path / name, dtype=dtype, mode='r',
+                                               shape=(self.index[-1],) + shape)
+            else:
+                self.columns[name] = np.empty((0,) + shape, dtype=dtype)
+
+    def __len__(self):
+        return len(self.index) - 1
+
+    def frame(self, n):
+        """The columns of the n-th frame."""
+        start, stop = self.index[n], self.index[n + 1]
+        return {name: column[start:stop] for name, column in self.columns.items()}
+
+
+class Replay:
+    """Draws the frames of a recording, scaled to a given size."""
+
+    def __init__(self, recording: Recording, size=None, stamps=False):
+        """
+        If stamps is set, particles are drawn through a StampCache, which
+        quantizes their alpha and rotation and is only faster when many
+        particles look the same.
+        """
+        self.recording = recording
+        self.size = tuple(size or recording.size)
+        self.scale = min(self.size[0] / recording.size[0], self.size[1] / recording.size[1])
+        self.stamps = StampCache() if stamps else None
+        self.prototypes = [self._prototype(shape) for shape in recording.shapes]
+
+    def _prototype(self, shape):
+        """A particle that is moved around to draw every particle of this shape."""
+
+        kind = shape['kind']
+        if kind == 'circle':
+            return CircleParticle(filled=shape['filled'])
+        if kind == 'square':
+            return SquareParticle()
+        if kind == 'polygon':
+            return PolygonParticle(shape['vertices'], vertex_step=shape['vertex_step'])
+        if kind == 'shard':
+            return ShardParticle(head=shape['head'], tail=shape['tail'])
+        if kind == 'line':
+            return LineParticle(shape['length'] * self.scale, width=shape['width'])
+        if kind == 'image':
+            return ImageParticle(pygame.image.load(str(self.recording.path / shape['file'])))
+        raise ValueError(f'Unknown shape {kind}.')
+
+    def particles(self, n):
+        """Yield a particle in the state of each particle of the n-th frame."""
+
+        frame = self.recording.frame(n)
+        rows = zip(
+            frame['x'].tolist(),
+            frame['y'].tolist(),
+            frame['size'].tolist(),
+            frame['rotation'].tolist(),
+            frame['color'].tolist(),
+            frame['shape'].tolist(),
+        )
+        scale = self.scale
+        for x, y, size, rotation, color, shape in rows:
+            particle = self.prototypes[shape]
+            particle.pos.update(x * scale, y * scale)
+            particle.size = size * scale
+            particle.angle = particle.inner_rotation = rotation
+            particle.speed = 1
+            if isinstance(particle, ImageParticle):
+                particle.alpha = color[3]
+            else:
+                particle.color.update(color)
+            yield particle
+
+    def draw(self, surf, n):
+        draw_particles(self.particles(n), surf, self.stamps)
+
+
+def render_range(path, out, start, stop, size=None, background='#282832', stamps=False):
+    """Render the frames start:stop of the recording to png files in out."""
+
+    replay = Replay(Recording(path), size, stamps)
+    surf = pygame.Surface(replay.size)
+    for n in range(start, stop):
+        surf.fill(background)
+        replay.draw(surf, n)
+        pygame.image.save(surf, str(Path(out) / f'{n:06}.png'))
+
+
+def render(path, out, size=None, background='#282832', processes=None, chunk=30, stamps=False):
+    """Render all the frames of a recording, with chunks of frames split between processes."""
+
+    Path(out).mkdir(parents=True, exist_ok=True)
+    frames = len(Recording(path))
+    jobs = [
+        (path, out, start, min(start + chunk, frames), size, background, stamps)
+        for start in range(0, frames, chunk)
+    ]
+    # Workers start from scratch instead of forking a process where SDL runs.
+    pool = multiprocessing.get_context('spawn').Pool(processes)
+    pool.starmap(render_range, jobs)
+    # SDL catches SIGTERM in the workers, so Pool.terminate() would wait forever.
+    pool.close()
+    pool.join()
+
+
+def main():
+    parser = ArgumentParser(description='Render a particle recording to png frames.')
+    parser.add_argument('recording')
+    parser.add_argument('out')
+    parser.add_argument('--size', help='Output resolution, like 1920x1080. Default: as recorded.')
+    parser.add_argument('--background', default='#282832')
+    parser.add_argument('--jobs', type=int, help='Number of processes. Default: all cores.')
+    parser.add_argument('--stamps', action='store_true',
+                        help='Draw through a StampCache: faster when many particles look the same, '
+                             'but alpha and rotation are quantized.')
+    args = parser.parse_args()
+
+    size = tuple(map(int, args.size.split('x'))) if args.size else None
+    render(args.recording, args.out, size, args.background, args.jobs, stamps=args.stamps)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,8 @@ import pygame
 import pygame.gfxdraw
 from pygame.locals import *
 
+from utils import DirtyRenderer, GlyphAtlas
+
 SIZE = (1500, 800)
 FPS = 60
 BG_COLOR = 0x202324
@@ -92,6 +94,8 @@ class Pendulum:
         self.angle2 += self.angle_vel2 * DT
 
     def draw(self, display):
+        """Draw the pendulums and return the rect they can reach."""
+
         center = pygame.Vector2(SIZE) / 2
         for a1, a2, l1, l2, color in zip(
             self.angle1, self.angle2, self.length1, self.length2, self.color
@@ -104,6 +108,9 @@ class Pendulum:
             # pygame.draw.line(display, (255, 255, 255), center, p1)
             # pygame.draw.line(display, (255, 255, 255), p1, p2)
 
+        reach = (self.length1 + self.length2).max() * SCALE + 1
+        return pygame.Rect(center - (reach, reach), (2 * reach + 1, 2 * reach + 1))
+
 
 def vec2int(vec):
     return (int(vec[0]), int(vec[1]))
@@ -121,6 +128,8 @@ def main():
     pygame.display.set_caption(CAPTION)
     clock = pygame.time.Clock()
     font = pygame.font.Font(None, 60)
+    digits = GlyphAtlas(font, WHITE)
+    renderer = DirtyRenderer(display, BG_COLOR)
 
     objects = [Pendulum(NB_PENDULUMS)]
 
@@ -145,16 +154,15 @@ def main():
             obj.logic()
 
         # Draw
-        display.fill(BG_COLOR)
+        renderer.clear()
 
         for obj in objects:
-            obj.draw(display)
+            renderer.mark(obj.draw(display))
 
         fps = clock.get_fps()
-        s = font.render(str(round(fps, 2)), True, WHITE)
-        display.blit(s, (5, 5))
+        renderer.mark(digits.draw(display, str(round(fps, 2)), (5, 5)))
 
-        pygame.display.update()
+        renderer.update()
         clock.tick(FPS)
 
 
@@ -11,6 +11,8 @@ from pygame import Vector2 as Vec2
 import pygame.gfxdraw as gfx
 from pygame.locals import *
 
+from utils import DirtyRenderer
+
 
 SIZE = (1500, 800)
 FPS = 60
@@ -22,6 +24,7 @@ def main():
     screen = pygame.display.set_mode(SIZE)
     pygame.display.set_caption(CAPTION)
     clock = pygame.time.Clock()
+    renderer = DirtyRenderer(screen, BG_COLOR)
 
     objects = []
 
@@ -46,12 +49,13 @@ def main():
             obj.logic()
 
         # Draw
-        screen.fill(BG_COLOR)
+        renderer.clear()
 
         for obj in objects:
-            obj.draw(screen)
+            # Objects return the rect they drew on, or None for anywhere
+            renderer.mark(obj.draw(screen))
 
-        pygame.display.update()
+        renderer.update()
         clock.tick(FPS)
 
 if __name__ == "__main__":
@@ -1,12 +1,15 @@
 from time import time
 from random import random, uniform, gauss
 from math import sin, cos, pi
-from colorsys import hsv_to_rgb, rgb_to_hsv
+from collections import OrderedDict
+from functools import lru_cache
 
+import numpy as np
 import pygame
-from utils import *
+from utils import Vec2, hsv_to_RGB, hsv_to_RGB_array, int_to_rgb
 
 pi2 = 2 * pi
+RNG = np.random.default_rng()
 
 
 class Sparkle:
@@ -73,8 +76,7 @@ class Sparkle:
     def fire(cls, pos):
         angle = gauss(3 * pi / 2, pi / 3)
         hue = time() / 5 + angle / 50
-        color = hsv_to_rgb(hue % 1, 1, 1)
-        color = [int(255 * x) for x in color]
+        color = hsv_to_RGB(hue, 1, 1)
 
         return Sparkle(
             pos,
@@ -95,8 +97,7 @@ class Sparkle:
         hue = gauss(0.60, 0.04)
         sat = gauss(0.62, 0.06)
         val = gauss(0.32, 0.06)
-        color = hsv_to_rgb(hue % 1, sat, val)
-        color = [int(255 * x) for x in color]
+        color = hsv_to_RGB(hue, sat, val)
 
         speed = gauss(7, 2)
 
@@ -118,8 +119,7 @@ class Sparkle:
             hue = angle / pi2
         else:
             hue = gauss(hue, 0.03)
-        color = hsv_to_rgb(hue % 1, 1, 1)
-        color = [int(255 * x) for x in color]
+        color = hsv_to_RGB(hue, 1, 1)
 
         return Sparkle(
             pos,
@@ -137,8 +137,7 @@ class Sparkle:
     def tommy(cls, pos, hue=0.1):
         angle = uniform(0, pi2)
         hue = gauss(hue, 0.02)
-        color = hsv_to_rgb(hue % 1, 1, 1)
-        color = [int(255 * x) for x in color]
+        color = hsv_to_RGB(hue, 1, 1)
 
         return Sparkle(
             pos,
@@ -153,12 +152,586 @@ class Sparkle:
         )
 
 
+@lru_cache(maxsize=None)
+def disc(radius):
+    """8 bit surface with a filled circle of color index 1, the rest being transparent."""
+
+    # The circle can touch the pixels at radius from the center on any side
+    surf = pygame.Surface((2 * radius + 3, 2 * radius + 3), depth=8)
+    surf.set_palette_at(0, (0, 0, 0))
+    surf.fill(0)
+    pygame.draw.circle(surf, 1, (radius + 1, radius + 1), radius)
+    surf.set_colorkey(0)
+    return surf
+
+
+class CircleStamps:
+    """
+    Filled circles rasterized once per (radius, color) and blitted afterwards.
+
+    pygame.draw.circle gives the same shape wherever the center is, so
+    blitting a stamp gives the same pixels. A stamp is a copy of the disc
+    of its radius with the palette recolored, so it takes one byte per pixel
+    and is cheap to make again. When they take more than max_bytes, the
+    oldest ones are dropped.
+    """
+
+    def __init__(self, max_bytes=16 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._stamps = OrderedDict()
+
+    def __len__(self):
+        return len(self._stamps)
+
+    @staticmethod
+    def keys(radii, colors):
+        """One int per (radius, color), radii and colors being arrays."""
+        colors = colors.astype(np.int64)
+        return radii.astype(np.int64) << 24 | colors[:, 0] << 16 | colors[:, 1] << 8 | colors[:, 2]
+
+    def _rasterize(self, key):
+        self.misses += 1
+        stamp = self._stamps[key] = disc(key >> 24).copy()
+        stamp.set_palette_at(1, (key >> 16 & 255, key >> 8 & 255, key & 255))
+        self.bytes += stamp.get_width() * stamp.get_height()
+        while self.bytes > self.max_bytes:
+            _, old = self._stamps.popitem(last=False)
+            self.bytes -= old.get_width() * old.get_height()
+        return stamp
+
+    def draw(self, screen, centers, radii, colors):
+        """Same as pygame.draw.circle for arrays of integer centers, radii and colors."""
+
+        shown = radii >= 1  # pygame.draw.circle does nothing below
+        radii = radii[shown]
+        topleft = centers[shown] - (radii + 1)[:, None]
+
+        # Sparkles are drawn in order, so that overlaps stay the same,
+        # but each stamp is looked up only once.
+        keys, inverse = np.unique(self.keys(radii, colors[shown]), return_inverse=True)
+        keys = keys.tolist()
+        stamps = list(map(self._stamps.get, keys))
+        misses = self.misses
+        for i, stamp in enumerate(stamps):
+            if stamp is None:
+                stamps[i] = self._rasterize(keys[i])
+        self.hits += len(radii) - (self.misses - misses)
+
+        screen.blits(zip(map(stamps.__getitem__, inverse.tolist()), topleft.tolist()), doreturn=False)
+
+    def clear(self):
+        self._stamps.clear()
+        self.bytes = self.hits = self.misses = 0
+
+
+CIRCLES = CircleStamps()
+
+
+def out_of_bounds(x, y):
+    """Whether sparkles at these positions are removed, as in Sparkle.update()."""
+    return (x < -50) | (x > 10000) | (y < -50) | (y > 10000)
+
+
+class SparkleRows:
+    """
+    Sparkles stored in NumPy columns, the base of the two kinds of rows
+    of a SparkleField.
+
+    The speed of a sparkle decreases by accel each frame, so the frame
+    where it stops is known when it is added. Rows are put in the bucket
+    of a timing wheel for that frame, and the whole bucket is freed when
+    the frame comes, instead of looking for the dead among all the rows.
+    Free rows are reused by the next sparkles, so the rows never move.
+    """
+
+    LAYOUT = {
+        'pos': ((2,), float),
+        'speed': ((), float),
+        'angle': ((), float),
+        'accel': ((), float),
+        'angular_accel': ((), float),
+        'gravity': ((), float),
+        'gravity_angle': ((), float),
+        'scale': ((), float),
+        'radius': ((), float),
+        'vel_bias': ((2,), float),
+        'color': ((3,), np.uint8),
+        'live': ((), bool),
+        'death': ((), np.int64),
+        'generation': ((), np.int64),
+    }
+    """
+    Shape of one row and dtype of each column. A radius of NaN follows the speed.
+    death is the frame the row is scheduled for, and generation counts how
+    many times the row was freed, to recognize outdated entries of the wheel.
+    """
+
+    WHEEL_SIZE = 256
+    """Number of frames in the timing wheel. Later deaths are rescheduled when their bucket comes."""
+    NEVER = np.iinfo(np.int64).max
+
+    def __init__(self, capacity=1024):
+        self._n = 0
+        """Number of rows used, including the free ones."""
+        self._alive = 0
+        self._free = np.empty(0, dtype=int)
+        self.capacity = capacity
+        for name, (shape, dtype) in self.LAYOUT.items():
+            setattr(self, name, np.zeros((capacity,) + shape, dtype=dtype))
+
+        self.frame = 0
+        self._wheel = [[] for _ in range(self.WHEEL_SIZE)]
+        """Lists of (rows, generations) to check at each frame, modulo WHEEL_SIZE."""
+
+    def __len__(self):
+        return self._alive
+
+    def _grow(self, capacity):
+        for name, (shape, dtype) in self.LAYOUT.items():
+            new = np.zeros((capacity,) + shape, dtype=dtype)
+            new[:self._n] = getattr(self, name)[:self._n]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def extend(self, n, columns):
+        """Append n sparkles, given as arrays of n values for each column of SparkleField.COLUMNS."""
+
+        if n <= 0:
+            return
+
+        kept = max(0, len(self._free) - n)
+        reused = self._free[kept:]
+        self._free = self._free[:kept]
+        new = n - len(reused)
+        if self._n + new > self.capacity:
+            self._grow(max(2 * self.capacity, self._n + new))
+        rows = np.concatenate((reused, np.arange(self._n, self._n + new)))
+        self._n += new
+        self._alive += n
+
+        for name, value in columns.items():
+            getattr(self, name)[rows] = value
+        self.live[rows] = True
+
+        self.death[rows] = self._death(rows)
+        self._schedule(rows[self.death[rows] != self.NEVER])
+
+    def _death(self, rows):
+        """The frame when the new rows have to be checked."""
+        raise NotImplementedError
+
+    def _stopped(self, rows):
+        """Which of the rows checked at this frame are dead."""
+        raise NotImplementedError
+
+    def clear(self):
+        self._n = 0
+        self._alive = 0
+        self._free = np.empty(0, dtype=int)
+        self._wheel = [[] for _ in range(self.WHEEL_SIZE)]
+
+    def _schedule(self, rows):
+        """Put the rows in the buckets of their death frame."""
+
+        if not len(rows):
+            return
+
+        frames = np.minimum(self.death[rows], self.frame + self.WHEEL_SIZE - 1)
+        order = np.argsort(frames, kind='stable')
+        frames, starts = np.unique(frames[order], return_index=True)
+        generations = self.generation[rows]
+        for frame, part in zip(frames.tolist(), np.split(order, starts[1:])):
+            self._wheel[frame % self.WHEEL_SIZE].append((rows[part], generations[part]))
+
+    def _free_rows(self, rows):
+        self.live[rows] = False
+        self.generation[rows] += 1
+        self._free = np.concatenate((self._free, rows))
+        self._alive -= len(rows)
+
+        # Stop updating the free rows at the end, e.g. after a burst
+        if len(self._free) > self._n // 2:
+            live = np.flatnonzero(self.live[:self._n])
+            self._n = live[-1] + 1 if len(live) else 0
+            self._free = self._free[self._free < self._n]
+
+    def _expire(self):
+        """Free the rows that die at this frame."""
+
+        bucket = self._wheel[self.frame % self.WHEEL_SIZE]
+        if not bucket:
+            return
+        self._wheel[self.frame % self.WHEEL_SIZE] = []
+
+        rows = np.concatenate([rows for rows, _ in bucket])
+        generations = np.concatenate([generations for _, generations in bucket])
+        # Rows freed and reused since they were scheduled are not concerned
+        rows = rows[self.generation[rows] == generations]
+
+        due = self.death[rows] <= self.frame
+        self._schedule(rows[~due])
+        rows = rows[due]
+
+        stopped = self._stopped(rows)
+        self._free_rows(rows[stopped])
+        late = rows[~stopped]
+        self.death[late] = self.frame + 1
+        self._schedule(late)
+
+    def rows(self):
+        """Indices of the rows of the sparkles alive."""
+        return np.flatnonzero(self.live[:self._n])
+
+    def positions(self, rows):
+        return self.pos[rows]
+
+    def speeds(self, rows):
+        return self.speed[rows]
+
+    def radii(self, rows):
+        """The radius each sparkle is drawn with."""
+
+        radius = self.radius[rows]
+        return np.where(np.isnan(radius), self.scale[rows] * self.speeds(rows), radius)
+
+    def draw(self, screen, stamps: CircleStamps = CIRCLES):
+        rows = self.rows()
+        # astype(int) truncates like int() in Sparkle.draw
+        stamps.draw(screen, self.positions(rows).astype(int), self.radii(rows).astype(int), self.color[rows])
+
+
+class SteeredSparkles(SparkleRows):
+    """Sparkles that are moved by a vectorized Sparkle.update() each frame."""
+
+    def _death(self, rows):
+        # The speed is below 0 after ceil(speed / accel) updates. It is
+        # checked one frame early as the rounding errors of the repeated
+        # subtractions can make it one more or one less.
+        speed = self.speed[rows]
+        accel = self.accel[rows]
+        stops = accel > 0
+        updates = np.maximum(1, np.ceil(speed[stops] / accel[stops]) - 1)
+        death = np.full(len(rows), self.NEVER)
+        death[stops] = self.frame + updates
+        return death
+
+    def _stopped(self, rows):
+        return self.speed[rows] <= 0
+
+    def logic(self, dt=1):
+        """Same as Sparkle.update() for all the sparkles, then remove the dead ones."""
+
+        self.frame += 1
+        n = self._n
+        pos = self.pos[:n]
+        speed = self.speed[:n]
+        angle = self.angle[:n]
+
+        pos[:, 0] += dt * (speed * np.cos(angle) + self.vel_bias[:n, 0])
+        pos[:, 1] += dt * (speed * np.sin(angle) + self.vel_bias[:n, 1])
+        speed -= self.accel[:n]
+        angle += self.angular_accel[:n]
+        angle %= pi2
+
+        steered = np.flatnonzero(self.gravity[:n])
+        if len(steered):
+            gravity = self.gravity[steered]
+            gravity_angle = self.gravity_angle[steered]
+            a = (angle[steered] - gravity_angle + pi) % pi2 - pi
+            a *= 1 - gravity
+            angle[steered] = (a + gravity_angle) % pi2
+
+        self._expire()
+
+        # Leaving the bounds depends on the steering, so it is checked every frame
+        out = out_of_bounds(pos[:, 0], pos[:, 1]) & self.live[:n]
+        if out.any():
+            self._free_rows(np.flatnonzero(out))
+
+
+class BallisticSparkles(SparkleRows):
+    """
+    Sparkles that go straight, without angular_accel nor gravity.
+
+    After k frames, such a sparkle has moved by k * speed - accel * k * (k - 1) / 2
+    in its direction, plus k times its bias, so the columns keep the values
+    it was added with and the positions are only computed when drawn.
+    Nothing is done per frame: the frame it stops or leaves the bounds is
+    found when it is added.
+    """
+
+    LAYOUT = {
+        **SparkleRows.LAYOUT,
+        'birth': ((), np.int64),
+    }
+
+    MAX_AGE = 1024
+    """Sparkles that live longer are not ballistic, their trajectory is not checked for so long."""
+
+    def extend(self, n, columns):
+        super().extend(n, {**columns, 'birth': self.frame})
+
+    def _death(self, rows):
+        speed = self.speed[rows]
+        accel = self.accel[rows]
+        death_age = np.maximum(1, np.ceil(speed / accel)).astype(np.int64)
+
+        # Only those that can go as far as the bounds before they stop are followed
+        reach = speed ** 2 / (2 * accel) + speed + np.abs(self.vel_bias[rows]).max(axis=1) * death_age
+        x, y = self.pos[rows].T
+        near = np.flatnonzero(out_of_bounds(x - reach, y - reach) | out_of_bounds(x + reach, y + reach))
+
+        # When they leave the bounds, for all their ages at once
+        if len(near) and death_age[near].max() > 1:
+            ages = np.arange(1, death_age[near].max())
+            pos = self.trajectories(rows[near], ages)
+            out = out_of_bounds(pos[..., 0], pos[..., 1])
+            out &= ages < death_age[near, None]
+            leaves = out.any(axis=1)
+            death_age[near[leaves]] = out[leaves].argmax(axis=1) + 1
+
+        return self.frame + death_age
+
+    def _stopped(self, rows):
+        return np.ones(len(rows), dtype=bool)
+
+    def trajectories(self, rows, ages):
+        """Positions of the rows at each of the ages, as a (rows, ages, 2) array."""
+
+        ages = np.asarray(ages, dtype=float)
+        speed = self.speed[rows, None]
+        travel = ages * speed - self.accel[rows, None] * ages * (ages - 1) / 2
+        angle = self.angle[rows, None]
+
+        pos = np.empty((len(rows), ages.shape[-1], 2))
+        pos[..., 0] = self.pos[rows, 0, None] + travel * np.cos(angle) + ages * self.vel_bias[rows, 0, None]
+        pos[..., 1] = self.pos[rows, 1, None] + travel * np.sin(angle) + ages * self.vel_bias[rows, 1, None]
+        return pos
+
+    def positions(self, rows):
+        ages = (self.frame - self.birth[rows])[:, None]
+        return self.trajectories(rows, ages)[:, 0]
+
+    def speeds(self, rows):
+        return self.speed[rows] - (self.frame - self.birth[rows]) * self.accel[rows]
+
+    def logic(self, dt=1):
+        """Remove the sparkles that die at this frame. dt is not supported."""
+        self.frame += 1
+        self._expire()
+
+
+class SparkleField:
+    """
+    Many sparkles, stored in NumPy columns and updated all at once.
+
+    It can replace a set of Sparkle: sparkles given to add() and update()
+    are copied in the columns. The batch methods fire(), swirl(), fireworks()
+    and tommy() append n rows at once, with the same distributions as the
+    Sparkle constructors.
+
+    Sparkles that go straight, like all those of fireworks() and tommy(),
+    are BallisticSparkles and cost nothing per frame. The others are
+    SteeredSparkles.
+    """
+
+    COLUMNS = ('pos', 'speed', 'angle', 'accel', 'angular_accel', 'gravity',
+               'gravity_angle', 'scale', 'radius', 'vel_bias', 'color')
+
+    DEFAULTS = {
+        'accel': 0.1,
+        'angular_accel': 0,
+        'color': int_to_rgb(0xffa500),
+        'gravity': 0,
+        'gravity_angle': pi / 2,
+        'scale': 2,
+        'radius': np.nan,
+        'vel_bias': (0, 0),
+    }
+    """Values of the columns not given to extend(), as in Sparkle."""
+
+    def __init__(self, capacity=1024):
+        self.steered = SteeredSparkles(capacity)
+        self.ballistic = BallisticSparkles(capacity)
+        self._added = []
+        """Rows of the sparkles given to add(), inserted all at once at the next frame."""
+
+    def __len__(self):
+        return len(self.steered) + len(self.ballistic) + len(self._added)
+
+    def extend(self, n, **columns):
+        """
+        Append n sparkles. Each column is given as a value for all of them or an array of n
+        values, and those that are not given take their default from DEFAULTS.
+        """
+
+        if n <= 0:
+            return
+
+        values = {}
+        for name in self.COLUMNS:
+            shape, dtype = SparkleRows.LAYOUT[name]
+            value = columns[name] if name in columns else self.DEFAULTS[name]
+            values[name] = np.broadcast_to(np.asarray(value, dtype=dtype), (n,) + shape)
+
+        accel = values['accel']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ballistic = ((values['angular_accel'] == 0) & (values['gravity'] == 0) & (accel > 0)
+                         & (values['speed'] / accel <= BallisticSparkles.MAX_AGE))
+
+        for store, mask in ((self.ballistic, ballistic), (self.steered, ~ballistic)):
+            count = np.count_nonzero(mask)
+            if count:
+                store.extend(count, {name: value[mask] for name, value in values.items()})
+
+    def add(self, sparkle: Sparkle):
+        color = sparkle.color
+        if isinstance(color, int):
+            color = int_to_rgb(color)
+
+        # Copied now, as the position is often the vector of the entity that emits it
+        self._added.append((
+            *sparkle.pos,
+            sparkle.speed,
+            sparkle.angle,
+            sparkle.accel,
+            sparkle.angular_accel,
+            sparkle.gravity,
+            sparkle.gravity_angle,
+            sparkle.scale,
+            np.nan if sparkle.radius is None else sparkle.radius,
+            *sparkle.vel_bias,
+            *tuple(color)[:3],
+        ))
+
+    def add_rows(self, rows):
+        """
+        Add sparkles given as tuples laid out like in add():
+        x, y, speed, angle, accel, angular_accel, gravity, gravity_angle, scale, radius, vel_bias, color.
+        """
+        self._added.extend(rows)
+
+    def update(self, sparkles):
+        for sparkle in sparkles:
+            self.add(sparkle)
+
+    def _insert_added(self):
+        if not self._added:
+            return
+
+        rows = np.array(self._added, dtype=float)
+        self._added = []
+        self.extend(
+            len(rows),
+            pos=rows[:, 0:2],
+            speed=rows[:, 2],
+            angle=rows[:, 3],
+            accel=rows[:, 4],
+            angular_accel=rows[:, 5],
+            gravity=rows[:, 6],
+            gravity_angle=rows[:, 7],
+            scale=rows[:, 8],
+            radius=rows[:, 9],
+            vel_bias=rows[:, 10:12],
+            color=rows[:, 12:15],
+        )
+
+    def clear(self):
+        self._added = []
+        self.steered.clear()
+        self.ballistic.clear()
+
+    def logic(self):
+        self._insert_added()
+        self.steered.logic()
+        self.ballistic.logic()
+
+    def draw(self, screen, stamps: CircleStamps = CIRCLES):
+        self._insert_added()
+        self.steered.draw(screen, stamps)
+        self.ballistic.draw(screen, stamps)
+
+    # Batch versions of the Sparkle constructors
+
+    def fire(self, pos, n=1):
+        angle = RNG.normal(3 * pi / 2, pi / 3, n)
+        hue = time() / 5 + angle / 50
+        self.extend(
+            n,
+            pos=tuple(pos),
+            speed=RNG.normal(7, 2, n),
+            angle=angle,
+            accel=np.maximum(0, RNG.normal(0.15, 0.03, n)),
+            angular_accel=0,
+            color=hsv_to_RGB_array(hue, 1, 1),
+            gravity=0.10,
+            gravity_angle=-pi / 2,
+        )
+
+    def swirl(self, pos, n=1):
+        """Particles that turn in a water swirl."""
+
+        speed = RNG.normal(7, 2, n)
+        self.extend(
+            n,
+            pos=tuple(pos),
+            speed=speed,
+            angle=RNG.uniform(0, pi2, n),
+            accel=0.15,
+            angular_accel=speed / 100,
+            color=hsv_to_RGB_array(RNG.normal(0.60, 0.04, n), RNG.normal(0.62, 0.06, n), RNG.normal(0.32, 0.06, n)),
+        )
+
+    def fireworks(self, pos, n=1, hue=None):
+        """Fireworks distribution. If hue is set, only particles of approx this hue."""
+
+        angle = RNG.uniform(0, pi2, n)
+        if hue is None:
+            hue = angle / pi2
+        else:
+            hue = RNG.normal(hue, 0.03, n)
+
+        self.extend(
+            n,
+            pos=tuple(pos),
+            speed=RNG.normal(8, 1, n),
+            accel=0.1,
+            angle=angle,
+            angular_accel=0,
+            color=hsv_to_RGB_array(hue, 1, 1),
+            gravity=0.00,
+            gravity_angle=pi / 2,
+            scale=RNG.normal(1, 0.1, n),
+        )
+
+    def tommy(self, pos, n=1, hue=0.1):
+        self.extend(
+            n,
+            pos=tuple(pos),
+            speed=RNG.normal(8, 1, n),
+            accel=0.8,
+            angle=RNG.uniform(0, pi2, n),
+            angular_accel=0,
+            color=hsv_to_RGB_array(RNG.normal(hue, 0.02, n), 1, 1),
+            gravity=0.00,
+            gravity_angle=pi / 2,
+            scale=RNG.normal(3, 0.2, n),
+        )
+
+
 class Fountain:
     def update(self):
         yield from []
 
+    def emit(self, field: SparkleField):
+        """Add the sparkles of one update to the field."""
+        field.update(self.update())
+
 
-class LambdaFountain:
+class LambdaFountain(Fountain):
     """A Particle emitter that repeatedly call a function generating one particle"""
 
     def __init__(self, func, density=1):
@@ -169,12 +742,18 @@ class LambdaFountain:
         for i in range(self.density):
             yield self.func()
 
+    def emit(self, field: SparkleField):
+        field.update([self.func() for _ in range(self.density)])
+
 
 class LineFountain(Fountain):
     """A particle emitter in straight line."""
 
-    def __init__(self, start, end, speed, hue, width):
-        """Sparkle Fountain between :start: and :end:."""
+    MIN_ARRAY_SIZE = 64
+    """Below this density, sparkles are added to the field one by one and inserted with the others."""
+
+    def __init__(self, start, end, speed, hue, width, density=1):
+        """Sparkle Fountain between :start: and :end:, with :density: sparkles per update."""
         Fountain.__init__(self)
 
         self.start = Vec2(*start)
@@ -182,19 +761,51 @@ class LineFountain(Fountain):
         self.speed = speed
         self.hue = hue
         self.width = width
+        self.density = density
 
-    def update(self):
+        # The segment does not move
         direc = self.end - self.start
-        start = self.start + direc.perp() * gauss(0, self.width / 3)
-        accel = self.speed ** 2 / (2 * direc.norm() + self.speed)
+        self.normal = direc.perp()
+        self.angle = direc.angle()
+        # So that sparkles stop at the end
+        self.accel = speed ** 2 / (2 * direc.norm() + speed)
+        # speed, angle, accel, angular_accel, gravity and gravity_angle, the same for each sparkle
+        self._row = (speed, self.angle, self.accel, 0, 0, pi / 2)
 
-        yield Sparkle(
-            start,
+    def update(self):
+        for _ in range(self.density):
+            yield Sparkle(
+                self.start + self.normal * gauss(0, self.width / 3),
+                speed=self.speed,
+                angle=self.angle,
+                accel=self.accel,
+                color=hsv_to_RGB(gauss(self.hue, 0.02), 1, 1),
+                scale=max(0, gauss(self.width / 30, self.width / 200))
+            )
+
+    def emit(self, field: SparkleField):
+        n = self.density
+        if n < self.MIN_ARRAY_SIZE:
+            x, y = self.start
+            nx, ny = self.normal
+            rows = []
+            for _ in range(n):
+                offset = gauss(0, self.width / 3)
+                rows.append((x + nx * offset, y + ny * offset, *self._row,
+                             max(0, gauss(self.width / 30, self.width / 200)), np.nan, 0, 0,
+                             *hsv_to_RGB(gauss(self.hue, 0.02), 1, 1)))
+            field.add_rows(rows)
+            return
+
+        offset = RNG.normal(0, self.width / 3, n)
+        field.extend(
+            n,
+            pos=np.add(tuple(self.start), offset[:, None] * tuple(self.normal)),
             speed=self.speed,
-            angle=direc.angle(),
-            accel=accel,
-            color=hsv_to_RGB(gauss(self.hue, 0.02), 1, 1),
-            scale=max(0, gauss(self.width / 30, self.width / 200))
+            angle=self.angle,
+            accel=self.accel,
+            color=hsv_to_RGB_array(RNG.normal(self.hue, 0.02, n), 1, 1),
+            scale=np.maximum(0, RNG.normal(self.width / 30, self.width / 200, n)),
         )
 
 
@@ -206,11 +817,11 @@ def main():
     screen = pygame.display.set_mode(SIZE)
     clock = pygame.time.Clock()
 
-    kind = -1
-    kinds = [Sparkle.fire, Sparkle.swirl, Sparkle.fireworks, Sparkle.tommy]
-
     fireworks = True
-    sparkles = set()
+    sparkles = SparkleField()
+
+    kind = -1
+    kinds = [sparkles.fire, sparkles.swirl, sparkles.fireworks, sparkles.tommy]
 
     segments = [
         # W
@@ -249,8 +860,7 @@ def main():
                     kind += 1
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 mouse = pygame.mouse.get_pos()
-                for _ in range(100):
-                    sparkles.add(Sparkle.fireworks(mouse))
+                sparkles.fireworks(mouse, 100)
 
                 if event.button == 1:
                     print(mouse, ", ", end='')
@@ -265,26 +875,18 @@ def main():
             if random() > 0.2:
                 pos = random() * SIZE[0], random() * SIZE[1]
                 hue = random() if random() < 0.95 else None
-                for _ in range(100):
-                    sparkles.add(Sparkle.fireworks(pos, hue))
+                sparkles.fireworks(pos, 100, hue)
 
-        for _ in range(3):
-            sparkles.add(kinds[kind](pygame.mouse.get_pos()))
+        kinds[kind](pygame.mouse.get_pos(), 3)
 
         for f in fountains:
-            sparkles.update(f.update())
+            f.emit(sparkles)
 
-        to_remove = set()
-        for s in sparkles:
-            s.update()
-            if not s.alive:
-                to_remove.add(s)
-        sparkles.difference_update(to_remove)
+        sparkles.logic()
 
         # Draw
         screen.fill(BG_COLOR)
-        for sparkle in sparkles:
-            sparkle.draw(screen)
+        sparkles.draw(screen)
 
         pygame.display.update()
         clock.tick(FPS)
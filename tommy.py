@@ -8,8 +8,8 @@ from typing import List
 import pygame
 from pygame.locals import *
 
-from sparkles import Sparkle, LineFountain, LambdaFountain
-from utils import *
+from sparkles import Sparkle, SparkleField, LineFountain, LambdaFountain
+from utils import Vec2, hsv_to_RGB
 
 
 SIZE = (1500, 800)
@@ -225,7 +225,7 @@ def main():
 
     objects = [player1, player2]
     win_fountains = []
-    sparkles = set()
+    sparkles = SparkleField()
 
     winner = None
     looser = None
@@ -284,12 +284,7 @@ def main():
             if not o.alive:
                 objects.remove(o)
 
-        to_remove = set()
-        for s in sparkles:
-            s.update()
-            if not s.alive:
-                to_remove.add(s)
-        sparkles.difference_update(to_remove)
+        sparkles.logic()
 
 
         if player1.alive and player2.alive:
@@ -317,20 +312,18 @@ def main():
                 win_fountains += [ LambdaFountain(partial(Sparkle.tommy, (873, 151), looser.hue), 3) ]
 
             for f in win_fountains:
-                sparkles.update(f.update())
+                f.emit(sparkles)
 
             # if random() < 0.05:
             #     sparkles.extend(
             #         fireworks((uniform(0, SIZE[0]), uniform(1, SIZE[1])), looser.hue)
             #     )
             if random() < 0.03:
-                sparkles.update(fireworks((873, 151)))
+                sparkles.fireworks((873, 151), 100, random() if random() < 0.95 else None)
 
         # Draw
         screen.fill(BG_COLOR)
-
-        for s in sparkles:
-            s.draw(screen)
+        sparkles.draw(screen)
 
         pygame.display.update()
         clock.tick(FPS)
@@ -3,6 +3,10 @@
 
 from math import sqrt, atan, pi
 from colorsys import hsv_to_rgb
+from collections import OrderedDict
+
+import numpy as np
+import pygame
 
 
 # Functions
@@ -12,10 +16,37 @@ def v2sum(a, b):
     return [a[0] + b[0], a[1] + b[1]]
 
 
+HUES = 1024
+"""Number of hues in HUE_WHEEL."""
+HUE_WHEEL = [tuple(255 * c for c in hsv_to_rgb(i / HUES, 1, 1)) for i in range(HUES)]
+"""The RGB colors in range 0-255, not rounded, of HUES hues evenly spaced with full saturation and value."""
+_HUE_WHEEL_ARRAY = np.array(HUE_WHEEL)
+_HUE_WHEEL_INT = [tuple(int(c) for c in color) for color in HUE_WHEEL]
+
+
 def hsv_to_RGB(hue, sat, val):
-    """Convert a HSV color in range 0-1 to a RGB in range 0-255."""
-    color = hsv_to_rgb(hue % 1, sat, val)
-    return [int(255*x) for x in color]
+    """
+    Convert a HSV color in range 0-1 to a RGB in range 0-255.
+
+    The hue is rounded to one of the HUE_WHEEL, so each channel is at most 1
+    away from int(255 * x) of colorsys.hsv_to_rgb. Every channel is
+    val * (255 - sat * (255 - w)), with w that channel in the HUE_WHEEL.
+    """
+    i = round(hue * HUES) % HUES
+    if sat == val == 1:
+        return list(_HUE_WHEEL_INT[i])
+    r, g, b = HUE_WHEEL[i]
+    return [int(val * (255 - sat * (255 - r))), int(val * (255 - sat * (255 - g))), int(val * (255 - sat * (255 - b)))]
+
+
+def hsv_to_RGB_array(hue, sat, val):
+    """Same as hsv_to_RGB for arrays of colors, as a (n, 3) uint8 array."""
+
+    hue = np.rint(np.asarray(hue, dtype=float) * HUES).astype(int) % HUES
+    sat = np.asarray(sat, dtype=float)[..., None]
+    val = np.asarray(val, dtype=float)[..., None]
+    rgb = val * (255 - sat * (255 - _HUE_WHEEL_ARRAY[hue]))
+    return np.clip(rgb, 0, 255).astype(np.uint8)
 
 
 def int_to_rgb(col: int):
@@ -139,3 +170,175 @@ class Vec2:
 
         return a
 
+
+# Display
+
+class DirtyRenderer:
+    """
+    Clears and updates only the parts of the screen that are drawn on.
+
+    Each frame, clear() erases what was drawn at the previous frame, the
+    rects that are drawn on are given to mark(), and update() pushes them
+    to the display, with the erased ones. When they cover more than
+    max_dirty of the screen, the whole screen is cleared and updated instead.
+
+    The background is a color or a surface of the size of the screen,
+    for scenes with a static part.
+    """
+
+    def __init__(self, screen, background, max_dirty=0.5):
+        self.screen = screen
+        self.background = background
+        self.max_dirty = max_dirty
+        self.full = True
+        """Whether the whole screen is cleared and updated this frame."""
+        self._previous = []
+        self._current = []
+        self._anywhere = False
+
+    def invalidate(self, background=None):
+        """Redraw everything at the next frame, e.g. when the background changes."""
+        if background is not None:
+            self.background = background
+        self.full = True
+
+    def _erase(self, rect=None):
+        if isinstance(self.background, pygame.Surface):
+            if rect is None:
+                self.screen.blit(self.background, (0, 0))
+            else:
+                self.screen.blit(self.background, rect, rect)
+        else:
+            self.screen.fill(self.background, rect)
+
+    def clear(self):
+        """Erase what was drawn at the last frame."""
+        if self.full:
+            self._erase()
+        else:
+            for rect in self._previous:
+                self._erase(rect)
+
+    def mark(self, rect):
+        """
+        Say that something was drawn in the rect, and return it.
+        None means anywhere, like the pygame.gfxdraw functions.
+        """
+        if rect is None:
+            self._anywhere = True
+        else:
+            self._current.append(pygame.Rect(rect))
+        return rect
+
+    def update(self):
+        """Push the changes of this frame to the display."""
+
+        width, height = self.screen.get_size()
+        max_dirty = self.max_dirty * width * height
+        # Things often stay in place, so the same rects are not pushed twice
+        rects = self._previous + [rect for rect in self._current if rect not in self._previous]
+        # Overlapping rects are counted twice, which only makes the fallback early
+        dirty = sum(rect.w * rect.h for rect in rects)
+        drawn = sum(rect.w * rect.h for rect in self._current)
+
+        if self.full or self._anywhere or dirty > max_dirty:
+            pygame.display.update()
+        else:
+            pygame.display.update(rects)
+
+        # What is drawn now is erased at the next frame
+        self.full = self._anywhere or drawn > max_dirty
+        self._anywhere = False
+        self._previous = self._current
+        self._current = []
+
+
+# Text
+
+class TextCache:
+    """
+    Rendered texts, keyed by (font, text, antialias, color, background).
+
+    Above maxsize, the least recently used text is dropped.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.texts = OrderedDict()
+
+    def render(self, font, text, antialias, color, background=None):
+        """Same as font.render(), but only rasterizes each text once."""
+
+        key = (font, text, antialias, tuple(pygame.Color(color)),
+               background and tuple(pygame.Color(background)))
+        try:
+            surf = self.texts[key]
+        except KeyError:
+            surf = self.texts[key] = font.render(text, antialias, color, background)
+            if len(self.texts) > self.maxsize:
+                self.texts.popitem(last=False)
+        else:
+            self.texts.move_to_end(key)
+        return surf
+
+
+TEXTS = TextCache()
+
+
+def render_text(font, text, antialias, color, background=None):
+    """Render a text with the shared TextCache, for texts that rarely change."""
+    return TEXTS.render(font, text, antialias, color, background)
+
+
+class GlyphAtlas:
+    """
+    Draws texts by blitting each character from pre-rendered glyphs.
+
+    This is for texts that change every frame, like counters, where
+    a TextCache would miss each time. Kerning is lost, which is fine
+    for digits. Characters are rendered the first time they are used.
+    """
+
+    def __init__(self, font, color, antialias=True, chars="0123456789.:-+% "):
+        self.font = font
+        self.color = color
+        self.antialias = antialias
+        self.glyphs = {}
+        for char in chars:
+            self.glyph(char)
+
+    def glyph(self, char):
+        """The surface of the character and its width."""
+        try:
+            return self.glyphs[char]
+        except KeyError:
+            surf = self.font.render(char, self.antialias, self.color)
+            glyph = self.glyphs[char] = surf, surf.get_width()
+            return glyph
+
+    def size(self, text):
+        """Size of the text, like font.size()."""
+        return sum(self.glyph(c)[1] for c in text), self.font.get_height()
+
+    def draw(self, surf, text, pos):
+        """Draw the text with its topleft at pos, and return the rect it covers."""
+
+        glyphs = self.glyphs
+        x, y = pos
+        blits = []
+        for char in text:
+            try:
+                glyph, width = glyphs[char]
+            except KeyError:
+                glyph, width = self.glyph(char)
+            blits.append((glyph, (x, y)))
+            x += width
+        surf.blits(blits, doreturn=False)
+        return pygame.Rect(pos, (x - pos[0], self.font.get_height()))
+
+    def render(self, text):
+        """The text on a new transparent surface, like font.render()."""
+
+        surf = pygame.Surface(self.size(text), pygame.SRCALPHA)
+        self.draw(surf, text, (0, 0))
+        return surf